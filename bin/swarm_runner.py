@@ -19,6 +19,12 @@
 # Same as above, using single host but via one command
 # ./bin/swarm_runner.py --swarm-config examples/swarm_config.yaml --log-level DEBUG -f examples/locustfile_simple run --run-time 100 --users 10 --spawn-rate 10 --csv mysql --params examples/params.yaml --num-workers 2 --drivers 127.0.0.1
 
+# Create and load the tables before the test
+# ./bin/swarm_runner.py --swarm-config examples/swarm_config.yaml -f use_cases/sysbench/locustfile_simple.py prepare --params use_cases/sysbench/params.yaml --processes 8
+
+# Convert seed files into memory-mapped columns before the test
+# ./bin/swarm_runner.py --swarm-config examples/swarm_config.yaml -f examples/locustfile_simple seed --params examples/params.yaml
+
 # Run master locally and workers truly distributed manner
 # ./bin/swarm_runner.py --swarm-config examples/swarm_config.yaml --log-level DEBUG -f examples/locustfile_simple run --run-time 100 --users 10 --spawn-rate 10 --csv mysql --params examples/params.yaml --num-workers 2 --drivers yin01a
 
@@ -123,6 +129,24 @@ class Main(Swarm):
             help="driver list. Be default will use local machine as driver",
         )
 
+        run_workers_subparser.add_argument(
+            "--first-worker-index",
+            action="store",
+            dest="first_worker_index",
+            type=int,
+            default=0,
+            help="index of the first worker on this load generator, for partitioned keys",
+        )
+
+        run_workers_subparser.add_argument(
+            "--total-workers",
+            action="store",
+            dest="total_workers",
+            type=int,
+            default=None,
+            help="number of workers on all load generators, for partitioned keys. Default: --num-workers",
+        )
+
         run_workers_subparser.set_defaults(func="main_workers")
 
         # Master
@@ -330,6 +354,49 @@ class Main(Swarm):
 
         run_subparser.set_defaults(func="main_run")
 
+        # Prepare
+        prepare_subparser = subparsers.add_parser(
+            "prepare",
+            help="create and load tables",
+            description="create tables and load generated rows as described by prepare: section of params file",
+        )
+
+        prepare_subparser.add_argument(
+            "--params",
+            action="store",
+            dest="xpand_params",
+            help="xpand params config file",
+            required=True,
+        )
+
+        prepare_subparser.add_argument(
+            "--processes",
+            action="store",
+            dest="processes",
+            type=int,
+            default=None,
+            help="number of loader processes. Default: prepare.processes from params file or number of cores",
+        )
+
+        prepare_subparser.set_defaults(func="main_prepare")
+
+        # Seed files
+        seed_subparser = subparsers.add_parser(
+            "seed",
+            help="convert seed files",
+            description="convert CSV seed files listed in seed_files: section of params file into memory-mapped columns",
+        )
+
+        seed_subparser.add_argument(
+            "--params",
+            action="store",
+            dest="xpand_params",
+            help="xpand params config file",
+            required=True,
+        )
+
+        seed_subparser.set_defaults(func="main_seed")
+
         self.args = parser.parse_args()
 
         super().__init__(self.args.swarm_config, self.args.log_level)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Many mostly idle connections from one worker process, using asyncio engine
+# Set async_engine.users in params.yaml and run one locust user per worker process:
+# locust  --locustfile examples/locustfile_async  --headless -u 1 --run-time 1m --spawn-rate 1 --csv mysql --params params.yaml
+
+from locust import between, task
+from xpand_locust.async_engine import AsyncLocust, AsyncTasks
+
+
+class MyAsyncTasks(AsyncTasks):
+    @task(10)
+    async def insert_order(self):
+        _ = await self.client.execute(
+            "insert into orders (product_name, amount) values (%s, %s)",
+            ("Computer", 10),
+        )
+
+    @task(1)
+    async def count_by_product(self):
+        _ = await self.client.query_all(
+            "select count(*) from orders where DATE(order_date) = DATE(NOW()) and product_name=%s",
+            ("Computer",),
+        )
+
+
+class MyUser(AsyncLocust):
+    async_tasks = MyAsyncTasks
+    wait_time = between(10, 30)
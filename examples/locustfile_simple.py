@@ -54,10 +54,11 @@ class MyTasks(CustomTasks):
 
 class MyUser(CustomLocust):
     def on_start(self):
-        pass
+        super(MyUser, self).on_start()  # connect ramp
 
     def on_stop(self):
-        self.client.conn.close()
+        self.client.close()
+        super(MyUser, self).on_stop()
 
     def __init__(self, *args, **kwargs):
         super(MyUser, self).__init__(*args, **kwargs)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov
+
+# Micro-benchmark: harness overhead of custom_timer per request, in nanoseconds
+# Run as
+# PYTHONPATH=. python3 experiments/bench_custom_timer.py --calls 1000000
+
+import argparse
+from time import perf_counter_ns
+
+from locust import events
+from locust.stats import RequestStats
+from xpand_locust.custom_timer import attach_stats_buffer, custom_timer
+from xpand_locust.stats_buffer import StatsBuffer
+
+
+class Client:
+    def noop(self):
+        return 1
+
+    @custom_timer(from_caller=True)
+    def timed_from_caller(self):
+        return 1
+
+    @custom_timer(name="point_select")
+    def timed_named(self):
+        return 1
+
+
+def run(method, calls):
+    start = perf_counter_ns()
+    for _ in range(calls):
+        method()
+    return (perf_counter_ns() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="custom_timer overhead")
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument(
+        "--with-listener",
+        action="store_true",
+        default=False,
+        help="log every request into RequestStats, as locust does",
+    )
+    parser.add_argument(
+        "--buffered",
+        action="store_true",
+        default=False,
+        help="record into StatsBuffer and fold it into RequestStats at the end",
+    )
+    args = parser.parse_args()
+
+    stats = RequestStats(use_response_times_cache=False)
+    if args.with_listener:
+        events.request_success.add_listener(
+            lambda request_type, name, response_time, response_length, **kw: stats.log_request(
+                request_type, name, response_time, response_length
+            )
+        )
+    stats_buffer = None
+    if args.buffered:
+        stats_buffer = StatsBuffer(stats)
+        attach_stats_buffer(stats_buffer)
+
+    client = Client()
+    baseline = run(client.noop, args.calls)
+    for label, method in [
+        ("from_caller", client.timed_from_caller),
+        ("named", client.timed_named),
+    ]:
+        per_call = run(method, args.calls)
+        if stats_buffer is not None:
+            start = perf_counter_ns()
+            stats_buffer.flush()
+            per_call += (perf_counter_ns() - start) / args.calls
+        print(
+            f"{label:>12}: {per_call:8.1f} ns/call, overhead {per_call - baseline:8.1f} ns/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov
+
+# Compare client CPU per query for every installed MySqlClient driver
+# Run as
+# PYTHONPATH=. python3 experiments/bench_drivers.py --params examples/params.yaml --queries 20000 \
+#   --query "select * from orders limit 10"
+
+import argparse
+import time
+
+from xpand_locust import load_yaml_config
+from xpand_locust.drivers import DriverException, drivers
+from xpand_locust.mysql_client import MySqlClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description="client CPU per query by driver")
+    parser.add_argument("--params", default="params.yaml")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--query", default="select 1")
+    args = parser.parse_args()
+
+    db_config = load_yaml_config(args.params).get("db_config")
+    print(f"{'driver':>12} {'cpu us/query':>14} {'wall us/query':>14}")
+    for name in drivers:
+        try:
+            client = MySqlClient(**dict(db_config, driver=name))
+        except DriverException as e:
+            print(f"{name:>12}: skipped, {e}")
+            continue
+        client._query_all(args.query)  # warm up
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(args.queries):
+            client._query_all(args.query)
+        cpu = (time.process_time() - cpu_start) / args.queries * 1e6
+        wall = (time.perf_counter() - wall_start) / args.queries * 1e6
+        print(f"{name:>12} {cpu:14.1f} {wall:14.1f}")
+        client.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov
+
+# Compare connect cost with a full TLS handshake on every connect and with resumed TLS sessions
+# db_config of the params file must have ssl configured, pymysql driver only
+# Run as
+# PYTHONPATH=. python3 experiments/bench_tls.py --params examples/params.yaml --connects 2000
+
+import argparse
+import time
+
+from xpand_locust import load_yaml_config
+from xpand_locust.mysql_client import MySqlClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description="client cost of TLS handshake per connect")
+    parser.add_argument("--params", default="params.yaml")
+    parser.add_argument("--connects", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_config = load_yaml_config(args.params).get("db_config")
+    if not isinstance(db_config.get("ssl"), dict):
+        parser.error("ssl is not configured in db_config")
+    print(f"{'resumption':>12} {'cpu us/connect':>16} {'wall us/connect':>16} {'resumed':>8}")
+    for resumption in (False, True):
+        ssl = dict(db_config["ssl"], session_resumption=resumption)
+        client = MySqlClient(**dict(db_config, driver="pymysql", ssl=ssl))
+        resumed = 0
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(args.connects):
+            client.connect()
+            resumed += client.conn._sock.session_reused
+        cpu = (time.process_time() - cpu_start) / args.connects * 1e6
+        wall = (time.perf_counter() - wall_start) / args.connects * 1e6
+        print(
+            f"{str(resumption):>12} {cpu:16.1f} {wall:16.1f} {resumed / args.connects:8.0%}"
+        )
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -253,7 +253,13 @@ class StatsEntry:
     """
 
     total_content_length = None
-    """ The sum of the content length of all the requests for this entry """
+    """ The sum of the content length of all the requests for this entry (rows returned for MySqlClient) """
+
+    total_rows_affected = None
+    """ The sum of rows inserted, updated or deleted by all the requests for this entry """
+
+    total_bytes = None
+    """ The sum of bytes received from the server by all the requests for this entry """
 
     start_time = None
     """ Time of the first request for this entry """
@@ -281,6 +287,8 @@ class StatsEntry:
         self.num_reqs_per_sec = {}
         self.num_fail_per_sec = {}
         self.total_content_length = 0
+        self.total_rows_affected = 0
+        self.total_bytes = 0
         if self.use_response_times_cache:
             self.response_times_cache = OrderedDict()
             self._cache_response_times(int(time.time()))
@@ -301,6 +309,10 @@ class StatsEntry:
         # increase total content-length
         self.total_content_length += content_length
 
+    def log_io(self, rows_affected, bytes_received):
+        self.total_rows_affected += rows_affected
+        self.total_bytes += bytes_received
+
     def _log_time_of_request(self, current_time):
         t = int(current_time)
         self.num_reqs_per_sec[t] = self.num_reqs_per_sec.setdefault(t, 0) + 1
@@ -421,6 +433,22 @@ class StatsEntry:
         except ZeroDivisionError:
             return 0
 
+    def _per_request_rate(self, total, current):
+        """total spread over requests per second, of the last 10 seconds or of the whole run"""
+        rps = self.current_rps if current else self.total_rps
+        try:
+            return rps * total / self.num_requests
+        except ZeroDivisionError:
+            return 0.0
+
+    def rows_per_sec(self, current=True):
+        """Rows returned or affected per second"""
+        return self._per_request_rate(self.total_content_length + self.total_rows_affected, current)
+
+    def mb_per_sec(self, current=True):
+        """MB received from the server per second"""
+        return self._per_request_rate(self.total_bytes, current) / 1_000_000
+
     def extend(self, other):
         """
         Extend the data from the current StatsEntry with the stats from another
@@ -447,6 +475,8 @@ class StatsEntry:
             # this means self.min_response_time is None, so we can safely replace it
             self.min_response_time = other.min_response_time
         self.total_content_length = self.total_content_length + other.total_content_length
+        self.total_rows_affected = self.total_rows_affected + other.total_rows_affected
+        self.total_bytes = self.total_bytes + other.total_bytes
 
         for key in other.response_times:
             self.response_times[key] = self.response_times.get(key, 0) + other.response_times[key]
@@ -479,6 +509,8 @@ class StatsEntry:
             "max_response_time": self.max_response_time,
             "min_response_time": self.min_response_time,
             "total_content_length": self.total_content_length,
+            "total_rows_affected": self.total_rows_affected,
+            "total_bytes": self.total_bytes,
             "response_times": self.response_times,
             "num_reqs_per_sec": self.num_reqs_per_sec,
             "num_fail_per_sec": self.num_fail_per_sec,
@@ -497,6 +529,8 @@ class StatsEntry:
             "max_response_time",
             "min_response_time",
             "total_content_length",
+            "total_rows_affected",
+            "total_bytes",
             "response_times",
             "num_reqs_per_sec",
             "num_fail_per_sec",
@@ -524,7 +558,7 @@ class StatsEntry:
         else:
             rps = self.total_rps
             fail_per_sec = self.total_fail_per_sec
-        return (" %-" + str(STATS_NAME_WIDTH) + "s %7d %12s  | %7.1f %7.1f %7.1f %7.1f  | %7.2f %7.2f") % (
+        return (" %-" + str(STATS_NAME_WIDTH) + "s %7d %12s  | %7.1f %7.1f %7.1f %7.1f  | %7.2f %7.2f  | %9.1f %7.2f") % (
             (self.method and self.method + " " or "") + self.name,
             self.num_requests,
             "%d(%.2f%%)" % (self.num_failures, self.fail_ratio * 100),
@@ -534,6 +568,8 @@ class StatsEntry:
             self.median_response_time or 0,
             rps or 0,
             fail_per_sec or 0,
+            self.rows_per_sec(current),
+            self.mb_per_sec(current),
         )
 
     def __str__(self):
@@ -723,14 +759,14 @@ def setup_distributed_stats_event_listeners(events, stats):
 
 def print_stats(stats, current=True):
     console_logger.info(
-        (" %-" + str(STATS_NAME_WIDTH) + "s %7s %12s  | %7s %7s %7s %7s  | %7s %7s")
-        % ("Name", "# reqs", "# fails", "Avg", "Min", "Max", "Median", "req/s", "failures/s")
+        (" %-" + str(STATS_NAME_WIDTH) + "s %7s %12s  | %7s %7s %7s %7s  | %7s %7s  | %9s %7s")
+        % ("Name", "# reqs", "# fails", "Avg", "Min", "Max", "Median", "req/s", "failures/s", "rows/s", "MB/s")
     )
-    console_logger.info("-" * (80 + STATS_NAME_WIDTH))
+    console_logger.info("-" * (100 + STATS_NAME_WIDTH))
     for key in sorted(stats.entries.keys()):
         r = stats.entries[key]
         console_logger.info(r.to_string(current=current))
-    console_logger.info("-" * (80 + STATS_NAME_WIDTH))
+    console_logger.info("-" * (100 + STATS_NAME_WIDTH))
     console_logger.info(stats.total.to_string(current=current))
     console_logger.info("")
 
@@ -826,7 +862,13 @@ class StatsCSV:
             "Average Content Size",
             "Requests/s",
             "Failures/s",
-        ] + get_readable_percentiles(self.percentiles_to_report)
+        ] + get_readable_percentiles(self.percentiles_to_report) + [
+            "Total Rows Returned",
+            "Total Rows Affected",
+            "Total Bytes Received",
+            "Rows/s",
+            "MB/s",
+        ]
 
         self.failures_columns = [
             "Method",
@@ -875,6 +917,13 @@ class StatsCSV:
                         stats_entry.total_fail_per_sec,
                     ],
                     self._percentile_fields(stats_entry),
+                    [
+                        stats_entry.total_content_length,
+                        stats_entry.total_rows_affected,
+                        stats_entry.total_bytes,
+                        stats_entry.rows_per_sec(current=False),
+                        stats_entry.mb_per_sec(current=False),
+                    ],
                 )
             )
 
@@ -939,6 +988,8 @@ class StatsCSVFileWriter(StatsCSV):
             "Total Min Response Time",
             "Total Max Response Time",
             "Total Average Content Size",
+            "Rows/s",
+            "MB/s",
         ]
 
     def __call__(self):
@@ -1022,6 +1073,8 @@ class StatsCSVFileWriter(StatsCSV):
                         stats_entry.min_response_time or 0,
                         stats_entry.max_response_time,
                         stats_entry.avg_content_length,
+                        f"{stats_entry.rows_per_sec(current=True):2f}",
+                        f"{stats_entry.mb_per_sec(current=True):2f}",
                     ),
                 )
             )
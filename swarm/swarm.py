@@ -17,7 +17,8 @@ from pssh.exceptions import (
     ShellError,
     UnknownHostError,
 )
-from xpand_locust import YamlConfigException, load_yaml_config
+from xpand_locust import YamlConfigException, convert_seed_file, load_yaml_config
+from xpand_locust.data_loader import LoaderException, prepare
 
 from .exceptions import CommandException, ProcessExecutonException, SwarmException
 from .run_subprocess import RunSubprocess, TimeoutException
@@ -158,6 +159,28 @@ class Swarm:
                 _ = client.run_command(cmd, stop_on_errors=True)
                 client.join()
 
+    def main_prepare(self):
+        """Create and load the tables from prepare: section of params file, locally"""
+        self.logger.info("Prepare has been started")
+        try:
+            prepare(self.args.xpand_params, self.args.processes, self.log_level)
+        except (LoaderException, YamlConfigException) as e:
+            self.logger.error(e)
+            raise SwarmException()
+
+    def main_seed(self):
+        """Convert seed files from seed_files: section of params file, locally"""
+        try:
+            seed_files = load_yaml_config(self.args.xpand_params).get("seed_files") or []
+            for seed_file in seed_files:
+                target = convert_seed_file(
+                    seed_file["file"], seed_file["columns"], seed_file.get("target")
+                )
+                self.logger.info(f"Seed file {seed_file['file']} has been converted to {target}")
+        except (YamlConfigException, KeyError, OSError, ValueError) as e:
+            self.logger.error(f"Seed file conversion has failed: {e!r}")
+            raise SwarmException()
+
     def main_standalone(self):
         """
         Run locust standalone - both masters and workers in the same process
@@ -344,7 +367,7 @@ class Swarm:
         master_options = self.config.get("locust_master_options")
 
         # Don't forget to change directory on remote workers
-        cmd = [f"cd {local_dir}"]
+        cd_cmd = f"cd {local_dir}"
 
         # ./bin/swarm_runner.py --swarm-config swarm_config.yaml --log-level DEBUG -f examples/locustfile_simple run_workers --num-workers 2 --master-host=127.0.0.1
         worker_cmd = " ".join(
@@ -362,23 +385,26 @@ class Swarm:
                 "--master-host",
                 master_host,
                 "--params",
-                self.args.xpand_params
+                self.args.xpand_params,
                 #  f"./{os.path.basename(self.args.xpand_params)}",  # This assumes that xpand_params has been copied to the remote dir
+                "--total-workers",
+                str(num_workers_per_driver * len(drivers_list)),
             ]
         )
-        cmd.append(worker_cmd)
 
-        self.logger.debug(cmd)
+        self.logger.debug([cd_cmd, worker_cmd])
         pssh_config = self.config.get("pssh_options")
         pssh_config["hosts"] = drivers_list
 
         try:
             client = ParallelSSHClient(**pssh_config)
             shells = client.open_shell()
-            client.run_shell_commands(
-                shells,
-                cmd,
-            )
+            # shells are in the order of drivers_list, every driver numbers its workers from its own index
+            for driver_index, shell in enumerate(shells):
+                shell.run(cd_cmd)
+                shell.run(
+                    f"{worker_cmd} --first-worker-index {driver_index * num_workers_per_driver}"
+                )
             client.join_shells(shells)
         except ShellError as e:
             self.logger.error(e)
@@ -412,12 +438,19 @@ class Swarm:
                 self.args.xpand_params,
             ]
         )
+        # Worker indexes for partitioned keys, workers of remote drivers are numbered by driver
+        first_worker_index = getattr(self.args, "first_worker_index", 0)
+        total_workers = getattr(self.args, "total_workers", None) or self.args.num_workers
         self.logger.info(f"Starting all {self.args.num_workers} workers")
         # TODO This should be instance variable and master should check that there is no fatal errors in workers (see below) and they are still running
         # This will required non blocking read from Popen - https://pypi.org/project/python-nonblock/
         running_procs = []
         for i in range(self.args.num_workers):
-            cmd = worker_cmd + f" </dev/null >worker{i}.out 2>&1"
+            cmd = (
+                worker_cmd
+                + f" --worker-index {first_worker_index + i} --workers {total_workers}"
+                + f" </dev/null >worker{i}.out 2>&1"
+            )
             self.logger.debug(f"Running {cmd}")
             running_procs.append(RunSubprocess(cmd=cmd).run_as_shell(wait=False))
             # TODO check that they has started at least
@@ -2,11 +2,14 @@
 # Copyright (C) 2021 dvolkov@mariadb
 
 import os
-import random
 
 from locust import between, task
 from xpand_locust import CustomLocust, CustomTasks, custom_timer
+from xpand_locust.custom_locust import custom_params
 from xpand_locust.custom_timer import custom_timer
+from xpand_locust.key_generators import key_generator
+
+INT_RANGE = {"low": -2147483648, "high": 2147483647}
 
 NUM_RECORDS_REQUIRED = 10000
 
@@ -14,6 +17,14 @@ NUM_RECORDS_REQUIRED = 10000
 class MyTasks(CustomTasks):
     def on_start(self):  # For every new user
         super(MyTasks, self).on_start()
+        # keys: section of params.yaml. Column a gets unique values, partitioned between workers
+        keys = custom_params.get_params("keys") or {}
+        self.new_a = key_generator(
+            "a",
+            keys.get("a", dict(INT_RANGE, distribution="sequence", partition="worker")),
+            self.user.user_index,
+        )
+        self.random_int = key_generator("int", keys.get("int", INT_RANGE))
 
     @task(1)
     @custom_timer
@@ -22,19 +33,19 @@ class MyTasks(CustomTasks):
         _ = self.client._execute(
             "insert into t1 (a,b,c,d) values (%s, %s,%s,%s)",
             (
-                random.randrange(-2147483648, 2147483647),
-                random.randrange(-2147483648, 2147483647),
-                random.randrange(-2147483648, 2147483647),
-                random.randrange(-2147483648, 2147483647),
+                self.new_a(),
+                self.random_int(),
+                self.random_int(),
+                self.random_int(),
             ),
         )
         _ = self.client._execute(
             "insert into t1 (a,b,c,d) values (%s, %s,%s,%s)",
             (
-                random.randrange(-2147483648, 2147483647),
-                random.randrange(-2147483648, 2147483647),
-                random.randrange(-2147483648, 2147483647),
-                random.randrange(-2147483648, 2147483647),
+                self.new_a(),
+                self.random_int(),
+                self.random_int(),
+                self.random_int(),
             ),
         )
         _ = self.client._execute(
@@ -48,7 +59,7 @@ class MyTasks(CustomTasks):
 
 class MyUser(CustomLocust):
     def on_start(self):
-        pass
+        super(MyUser, self).on_start()  # connect ramp
 
     def __init__(self, *args, **kwargs):
         super(MyUser, self).__init__(*args, **kwargs)
@@ -14,6 +14,8 @@ import numpy
 from locust import LoadTestShape, between, constant, constant_throughput, task
 
 from xpand_locust import CustomLocust, CustomTasks, custom_timer
+from xpand_locust.custom_locust import custom_params
+from xpand_locust.key_generators import key_generator
 
 locust.runners.WORKER_REPORT_INTERVAL = 1.0
 locust.stats.CONSOLE_STATS_INTERVAL_SEC = 1
@@ -28,16 +30,6 @@ TABLES = 10
 RECONNECT_RATE = 1000
 
 
-def get_random_id():
-    """Return random record id"""
-    return numpy.random.randint(0, TOTAL_ROWS - BULK_ROWS)
-
-
-def get_table_num():
-    """Return random table num"""
-    return numpy.random.randint(1, TABLES + 1)
-
-
 def c_value():
     s = str(numpy.random.randint(1, 10))
     one_group = s * 11
@@ -58,6 +50,12 @@ class MyTasks(CustomTasks):
 
     def on_start(self):  # For every new user
         self.request_count = 0
+        # keys: section of params.yaml, uniform by default. Generators are shared by all users
+        keys = custom_params.get_params("keys") or {}
+        self.get_random_id = key_generator(
+            "id", keys.get("id", {"low": 0, "high": TOTAL_ROWS - BULK_ROWS - 1})
+        )
+        self.get_table_num = key_generator("table", keys.get("table", {"high": TABLES}))
         # super(MyTasks, self).on_start()
 
     def reconnect(self):
@@ -66,62 +64,62 @@ class MyTasks(CustomTasks):
             self.client.connect()
 
     def point_selects(self):
-        random_id = get_random_id()
-        q = f"SELECT c FROM sbtest{get_table_num()} WHERE id=%s"
+        random_id = self.get_random_id()
+        q = f"SELECT c FROM sbtest{self.get_table_num()} WHERE id=%s"
         r = self.client._query(
             q,
             (random_id,),
         )
 
     def simple_ranges(self):
-        random_id = get_random_id()
-        q = f"SELECT c FROM sbtest{get_table_num()} WHERE id BETWEEN %s AND %s"
-        _ = self.client._query_all(
+        random_id = self.get_random_id()
+        q = f"SELECT c FROM sbtest{self.get_table_num()} WHERE id BETWEEN %s AND %s"
+        _ = self.client._query_count(
             q,
             (random_id, random_id + BULK_ROWS),
         )
 
     def ordered_ranges(self):
-        random_id = get_random_id()
-        q = f"SELECT c FROM sbtest{get_table_num()} WHERE id BETWEEN %s AND %s ORDER BY c"
-        _ = self.client._query_all(
+        random_id = self.get_random_id()
+        q = f"SELECT c FROM sbtest{self.get_table_num()} WHERE id BETWEEN %s AND %s ORDER BY c"
+        _ = self.client._query_count(
             q,
             (random_id, random_id + BULK_ROWS),
         )
 
     def non_index_updates(self):
-        random_id = get_random_id()
+        random_id = self.get_random_id()
         random_str = c_value()
-        q = f"UPDATE sbtest{get_table_num()} SET c=%s WHERE id=%s"
+        q = f"UPDATE sbtest{self.get_table_num()} SET c=%s WHERE id=%s"
         self.client.trx_begin()
         self.client._execute(q, (random_str, random_id))
         self.client.trx_commit()
 
     def index_updates(self):
-        random_id = get_random_id()
+        random_id = self.get_random_id()
         random_str = c_value()
-        q = f"UPDATE sbtest{get_table_num()} SET k=k+1 WHERE id=%s"
+        q = f"UPDATE sbtest{self.get_table_num()} SET k=k+1 WHERE id=%s"
         self.client.trx_begin()
         self.client._execute(q, (random_id,))
         self.client.trx_commit()
 
     def delete_inserts(self):
-        random_id = get_random_id()
+        random_id = self.get_random_id()
         random_str = c_value()
-        tab_num = get_table_num()
+        tab_num = self.get_table_num()
         q = f"DELETE from  sbtest{tab_num} WHERE id=%s"
         self.client.trx_begin()
 
         self.client._execute(q, (random_id,))
         q = f"INSERT INTO sbtest{tab_num} (id, k, c, pad) VALUES (%s, %s, %s, %s)"
-        self.client._execute(q, (random_id, get_random_id(), c_value(), pad_value()))
+        self.client._execute(q, (random_id, self.get_random_id(), c_value(), pad_value()))
         self.client.trx_commit()
 
     @task(1)
     def new_order(self):
         self._new_order()
 
-    @custom_timer
+    @custom_timer(spans=True)
     def _new_order(self):
         for _ in range(9):
             self.point_selects()
@@ -134,7 +132,7 @@ class MyTasks(CustomTasks):
     def credit_check(self):
         self._credit_check()
 
-    @custom_timer
+    @custom_timer(spans=True)
     def _credit_check(self):
         for _ in range(9):
             self.simple_ranges()
@@ -145,10 +143,11 @@ class MyTasks(CustomTasks):
 
 class MyUser(CustomLocust):
     def on_start(self):
-        pass
+        super(MyUser, self).on_start()  # connect ramp
 
     def on_stop(self):
-        self.client.conn.close()
+        self.client.close()
+        super(MyUser, self).on_stop()
 
     def __init__(self, *args, **kwargs):
         super(MyUser, self).__init__(*args, **kwargs)
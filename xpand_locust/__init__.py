@@ -1,3 +1,3 @@
 from .custom_locust import CustomClient, CustomLocust, CustomTasks
-from .locust_utils import load_seed_file, load_yaml_config, YamlConfigException, histogram
+from .locust_utils import load_seed_file, load_yaml_config, YamlConfigException, histogram, seed_data, convert_seed_file
 from .custom_timer import custom_timer
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# asyncio execution engine: one locust user per worker process runs an asyncio loop
+# that drives thousands of async users, each holding one AsyncMySqlClient connection.
+# gevent.monkey patches selectors, so the loop cooperates with the rest of the worker
+# (stats reporting, heartbeats) and timings go through the usual locust stats pipeline.
+#
+# params.yaml:
+# async_engine:
+#   users: 20000 # async users (connections) per worker process
+#   spawn_rate: 500 # async users started per second
+#
+# Run with --users equal to number of worker processes: one AsyncLocust per process
+
+import asyncio
+import logging
+import random
+
+from gevent import GreenletExit
+from locust import User
+
+from .async_mysql_client import AsyncMySqlClient
+from .custom_locust import custom_params
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ASYNC_USERS = 1000
+DEFAULT_ASYNC_SPAWN_RATE = 100
+
+
+class AsyncTasks:
+    """Base class for asyncio task sets, the async counterpart of CustomTasks
+
+    Tasks are coroutines decorated with locust @task(weight), weights from params.yaml take precedence
+    """
+
+    _weighted_tasks = None
+
+    def __init__(self, user, client):
+        self.user = user
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def weighted_tasks(cls):
+        """Build the weighted task list once per class, not per async user"""
+        if cls.__dict__.get("_weighted_tasks") is None:
+            custom_weights = custom_params.get_params("weights") or {}
+            tasks = []
+            for name in dir(cls):
+                func = getattr(cls, name)
+                if not hasattr(func, "locust_task_weight"):
+                    continue
+                weight = custom_weights.get(func.__name__, func.locust_task_weight)
+                logger.debug(f"applying weight {weight} for function {func.__name__} ")
+                tasks.extend([func] * weight)
+            cls._weighted_tasks = tasks
+        return cls._weighted_tasks
+
+    async def on_start(self):
+        pass
+
+    async def on_stop(self):
+        pass
+
+    async def run(self):
+        tasks = self.weighted_tasks()
+        await self.on_start()
+        try:
+            while True:
+                try:
+                    await random.choice(tasks)(self)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Unhandled exception in async task: {e}")
+                await asyncio.sleep(self.user.wait_time())
+        finally:
+            await self.on_stop()
+
+
+class AsyncLocust(User):
+    """Locust user that runs an asyncio loop with many async users (AsyncTasks)"""
+
+    abstract = True
+    async_tasks = None  # AsyncTasks subclass
+    _engine_running = False
+
+    def run(self):
+        if AsyncLocust._engine_running:
+            logger.error("Only one AsyncLocust per worker process is supported")
+            return
+        AsyncLocust._engine_running = True
+        loop = asyncio.new_event_loop()
+        main = loop.create_task(self._run_async_users())
+        try:
+            loop.run_until_complete(main)
+        except GreenletExit:
+            main.cancel()
+            loop.run_until_complete(asyncio.gather(main, return_exceptions=True))
+            raise
+        finally:
+            loop.close()
+            AsyncLocust._engine_running = False
+
+    async def _run_async_users(self):
+        settings = custom_params.get_params("async_engine") or {}
+        users = settings.get("users", DEFAULT_ASYNC_USERS)
+        spawn_rate = settings.get("spawn_rate", DEFAULT_ASYNC_SPAWN_RATE)
+        if not isinstance(spawn_rate, int) or spawn_rate < 1:
+            logger.error(
+                f"async_engine spawn_rate must be a whole number of users per second, got {spawn_rate}"
+            )
+            return
+        db_config = custom_params.get_params("db_config")
+
+        logger.info(f"Spawning {users} async users at {spawn_rate}/s")
+        async_users = []
+        try:
+            for i in range(users):
+                async_users.append(asyncio.ensure_future(self._async_user(db_config)))
+                if (i + 1) % spawn_rate == 0:
+                    await asyncio.sleep(1)
+            # Same as CustomTasks: measure only when all users are running
+            self.environment.events.reset_stats.fire()
+            self.environment.runner.stats.reset_all()
+            await asyncio.gather(*async_users)
+        finally:
+            for async_user in async_users:
+                async_user.cancel()
+            await asyncio.gather(*async_users, return_exceptions=True)
+
+    async def _async_user(self, db_config):
+        client = AsyncMySqlClient(**db_config)
+        try:
+            await client.connect()
+        except Exception as e:  # attempts are reported as CONNECT <host> failures
+            logger.error(f"Async user failed to connect: {e}")
+            return
+        try:
+            await self.async_tasks(self, client).run()
+        finally:
+            client.close()
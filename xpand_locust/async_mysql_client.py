@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+import asyncio
+import logging
+import random
+from time import perf_counter_ns
+
+import aiomysql  # https://github.com/aio-libs/aiomysql
+import pymysql
+
+from .custom_timer import async_custom_timer, log_metric
+from .drivers import ssl_context
+from .mysql_client import (
+    CONNECT_REQUEST_TYPE,
+    CONNECT_RETRY,
+    MySqlClientRetryException,
+    lost_connection_codes,
+    retry_transaction_codes,
+)
+from .retry_policy import RETRY_REQUEST_TYPE, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+# db_config keys used by MySqlClient only
+SYNC_ONLY_PARAMS = (
+    "driver",
+    "prepared",
+    "prepared_cache_size",
+    "load_balancer",
+    "eject_after",
+    "probe_interval",
+    "retry",
+    "connect_retry",
+    "result_format",
+    "digests",
+    "keepalive",
+)
+
+
+def _rows_returned(row) -> int:
+    """Response length of query(): rows returned, as for MySqlClient"""
+    return 0 if row is None else 1
+
+
+def errno_of(e) -> int:
+    return e.args[0] if e.args and isinstance(e.args[0], int) else 0
+
+
+def aiomysql_connect_params(params: dict) -> dict:
+    """Translate db_config into aiomysql.connect() arguments"""
+    params = params.copy()
+    for key in SYNC_ONLY_PARAMS:
+        params.pop(key, None)
+    if "database" in params:
+        params["db"] = params.pop("database")
+    # aiomysql has no socket level read/write timeouts
+    params.pop("read_timeout", None)
+    params.pop("write_timeout", None)
+    ssl_config = params.pop("ssl", None)
+    if isinstance(ssl_config, dict) and ssl_config:
+        # same verification as MySqlClient connections
+        params["ssl"] = ssl_context(ssl_config)
+    params["cursorclass"] = aiomysql.DictCursor
+    return params
+
+
+class AsyncMySqlClient:
+    """asyncio variant of MySqlClient: same API, every method is a coroutine"""
+
+    def __init__(self, **kwargs):
+        self.connect_params = aiomysql_connect_params(kwargs)
+        hosts = kwargs.get("host").split(",")
+        self.connect_params["host"] = random.choice(hosts)
+        self.retry_policy = RetryPolicy(**kwargs.get("retry", {}))
+        self.connect_retry_policy = RetryPolicy(
+            **dict(CONNECT_RETRY, **kwargs.get("connect_retry", {}))
+        )
+        self.conn, self.cur = None, None
+
+    async def _retry(self, name, exceptions, policy, operation, *args):
+        """RetryPolicy.call for coroutines"""
+        for attempt in range(policy.tries):
+            start_time = perf_counter_ns()
+            try:
+                return await operation(*args)
+            except exceptions as e:
+                if attempt == policy.tries - 1:
+                    raise
+                await asyncio.sleep(policy.delay(attempt))
+                log_metric(
+                    RETRY_REQUEST_TYPE,
+                    f"{name}/{errno_of(e)}",
+                    perf_counter_ns() - start_time,
+                )
+
+    async def _connect(self):
+        """Every attempt is reported as CONNECT <host>, failed ones as its failures"""
+        self.close()
+        host = self.connect_params["host"]
+        start_time = perf_counter_ns()
+        try:
+            self.conn = await aiomysql.connect(**self.connect_params)
+        except pymysql.Error as e:
+            log_metric(CONNECT_REQUEST_TYPE, host, perf_counter_ns() - start_time, exception=e)
+            raise
+        log_metric(CONNECT_REQUEST_TYPE, host, perf_counter_ns() - start_time)
+        self.cur = await self.conn.cursor()
+        return (self.conn, self.cur)
+
+    async def connect(self):
+        return await self._retry(
+            "connect", pymysql.Error, self.connect_retry_policy, self._connect
+        )
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn, self.cur = None, None
+
+    async def handle_exception(self, e):
+        errno = errno_of(e)
+
+        if errno in retry_transaction_codes:
+            raise MySqlClientRetryException(errno)
+
+        # connection closed from driver side or database problem and I've lost connection
+        if isinstance(e, pymysql.InterfaceError) or errno in lost_connection_codes:
+            await self.connect()
+
+        raise e  # Now I am ready to repeat the transaction again
+
+    async def _run_query(self, query, params):
+        try:
+            await self.cur.execute(query, params)
+            return await self.cur.fetchone()
+        except pymysql.Error as e:
+            await self.handle_exception(e)
+
+    async def _run_query_all(self, query, params):
+        try:
+            await self.cur.execute(query, params)
+            return await self.cur.fetchall()
+        except pymysql.Error as e:
+            await self.handle_exception(e)
+
+    async def _run_execute(self, query, params):
+        try:
+            await self.cur.execute(query, params)
+            return self.cur.rowcount  # Return how many values has been updated
+        except pymysql.Error as e:
+            await self.handle_exception(e)
+
+    async def _run_executemany(self, query, params):
+        try:
+            await self.cur.executemany(query, params)
+            return self.cur.rowcount  # Return how many values has been updated
+        except pymysql.Error as e:
+            await self.handle_exception(e)
+
+    async def _query(self, query, params=None):
+        return await self._retry(
+            "query",
+            MySqlClientRetryException,
+            self.retry_policy,
+            self._run_query,
+            query,
+            params,
+        )
+
+    async def _query_all(self, query, params=None):
+        return await self._retry(
+            "query_all",
+            MySqlClientRetryException,
+            self.retry_policy,
+            self._run_query_all,
+            query,
+            params,
+        )
+
+    async def _execute(self, query, params):
+        return await self._retry(
+            "execute",
+            MySqlClientRetryException,
+            self.retry_policy,
+            self._run_execute,
+            query,
+            params,
+        )
+
+    async def _executemany(self, query, params):
+        return await self._retry(
+            "executemany",
+            MySqlClientRetryException,
+            self.retry_policy,
+            self._run_executemany,
+            query,
+            params,
+        )
+
+    async def trx_begin(self):
+        await self.conn.begin()
+
+    async def trx_commit(self):
+        await self.conn.commit()
+
+    @async_custom_timer(from_caller=True)
+    async def execute(self, query, params):
+        return await self._execute(query, params)
+
+    @async_custom_timer(from_caller=True)
+    async def executemany(self, query, params):
+        return await self._executemany(query, params)
+
+    @async_custom_timer(from_caller=True)
+    async def query_all(self, query, params=None):
+        return await self._query_all(query, params)
+
+    @async_custom_timer(from_caller=True, result_length=_rows_returned)
+    async def query(self, query, params=None):
+        return await self._query(query, params)
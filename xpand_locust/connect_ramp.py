@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Connection ramp: users of a worker process open their connections at a limited rate with
+# bounded concurrency before any of them starts its tasks, instead of all at once at spawn time.
+#
+# params.yaml:
+# connect_ramp:
+#   rate: 200 # connects per second per worker process, 0 - unlimited
+#   concurrency: 20 # connects in flight per worker process, 0 - unlimited
+#
+# Every connect attempt of the process goes through the ramp, reconnects and pool connects included.
+# Reported as:
+#   RAMP wait - time a connect attempt waited for its turn
+#   RAMP attempts/<n> - users connected in n attempts, response time is the time to connect
+#   RAMP failed - users that have not connected after all connect_retry attempts
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from time import perf_counter_ns
+
+import gevent
+from gevent.event import Event
+from gevent.lock import BoundedSemaphore
+
+from .custom_timer import log_metric
+
+logger = logging.getLogger(__name__)
+
+RAMP_REQUEST_TYPE = "RAMP"
+
+
+class ConnectRamp:
+    def __init__(self, rate: float = 0, concurrency: int = 0):
+        self.interval = 1 / rate if rate else 0
+        self.slots = BoundedSemaphore(concurrency) if concurrency else None
+        self.next_start = 0.0  # time.monotonic() of the next connect attempt
+        self.pending = 0  # users registered and not connected yet
+        self.ready = Event()
+        self.ready.set()
+        self.started = None
+        self.attempts = Counter()  # attempts per connected user -> users
+        self.failed = 0
+
+    @contextmanager
+    def gate(self):
+        """Wait for the turn of a connect attempt, hold a concurrency slot while connecting"""
+        start_time = perf_counter_ns()
+        if self.interval:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+            if start > now:
+                gevent.sleep(start - now)
+        if self.slots is not None:
+            self.slots.acquire()
+        log_metric(RAMP_REQUEST_TYPE, "wait", perf_counter_ns() - start_time)
+        try:
+            yield
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def register(self):
+        """User will connect in preconnect(), until then users do not start their tasks"""
+        if self.pending == 0:
+            self.started = time.monotonic()
+        self.pending += 1
+        self.ready.clear()
+
+    def preconnect(self, client):
+        """Connect client of a registered user, report the number of attempts it took"""
+        start_time = perf_counter_ns()
+        attempts = client.connect_attempts
+        try:
+            client.connect()
+        except Exception as e:
+            self.failed += 1
+            log_metric(RAMP_REQUEST_TYPE, "failed", perf_counter_ns() - start_time, exception=e)
+            raise
+        else:
+            attempts = client.connect_attempts - attempts
+            self.attempts[attempts] += 1
+            log_metric(
+                RAMP_REQUEST_TYPE, f"attempts/{attempts}", perf_counter_ns() - start_time
+            )
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                self._done()
+
+    def _done(self):
+        attempts = ", ".join(f"{n}: {users}" for n, users in sorted(self.attempts.items()))
+        logger.info(
+            f"Connect ramp: {sum(self.attempts.values())} users connected, {self.failed} failed "
+            f"in {time.monotonic() - self.started:.1f}s, users by connect attempts {{{attempts}}}"
+        )
+        self.ready.set()
+
+
+_ramp = None
+_no_gate = nullcontext()
+
+
+def configure_ramp(rate: float = 0, concurrency: int = 0):
+    global _ramp
+    _ramp = ConnectRamp(rate, concurrency)
+    return _ramp
+
+
+def get_ramp():
+    return _ramp
+
+
+def connect_gate():
+    """Context of one connect attempt"""
+    return _ramp.gate() if _ramp is not None else _no_gate
+
+
+def wait_ramp():
+    """Wait until all registered users are connected (or have failed to)"""
+    if _ramp is not None:
+        _ramp.ready.wait()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Connection pool shared by all users of a worker process. Users borrow a connection
+# for the duration of one task and return it afterwards, so many simulated users run
+# over few real connections, the way application servers do.
+#
+# params.yaml:
+# connection_pool:
+#   min_size: 10 # connections kept open even when idle
+#   max_size: 2000 # connections per worker process
+#   idle_timeout: 60 # seconds, idle connections above min_size are closed after that
+#   max_lifetime: 3600 # seconds, connections are closed on return after that, 0 - forever
+#   borrow_timeout: 10 # seconds to wait for a free connection
+
+import logging
+import time
+from collections import deque
+
+import gevent
+from gevent.lock import BoundedSemaphore
+
+from .custom_timer import log_metric
+from .mysql_client import MySqlClient
+
+logger = logging.getLogger(__name__)
+
+POOL_REQUEST_TYPE = "POOL"
+MAINTENANCE_INTERVAL_SEC = 1
+
+
+class PoolTimeoutException(Exception):
+    """No free connection within borrow_timeout"""
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        db_config: dict,
+        min_size: int = 0,
+        max_size: int = 100,
+        idle_timeout: float = 60,
+        max_lifetime: float = 0,
+        borrow_timeout: float = 10,
+        client_class=MySqlClient,
+    ):
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.borrow_timeout = borrow_timeout
+        self.client_class = client_class
+        self.idle = deque()  # most recently returned on the right
+        self.size = 0  # idle + borrowed
+        self.slots = BoundedSemaphore(max_size)
+        self.maintainer = gevent.spawn(self._maintain)
+
+    def _new_client(self):
+        self.size += 1
+        try:
+            client = self.client_class(**self.db_config)
+        except Exception:
+            self.size -= 1
+            raise
+        client.pool_created = client.pool_returned = client.pool_pinged = time.monotonic()
+        return client
+
+    def _close(self, client):
+        self.size -= 1
+        client.close()
+
+    def borrow(self):
+        """Get a connection, wait up to borrow_timeout. Wait time is reported as POOL borrow"""
+        start_time = time.perf_counter_ns()
+        if not self.slots.acquire(timeout=self.borrow_timeout):
+            e = PoolTimeoutException(
+                f"No free connection in {self.borrow_timeout}s, pool size {self.max_size}"
+            )
+            log_metric(
+                POOL_REQUEST_TYPE, "borrow", time.perf_counter_ns() - start_time, exception=e
+            )
+            raise e
+        try:
+            client = self.idle.pop() if self.idle else self._new_client()
+        except Exception:
+            self.slots.release()
+            raise
+        log_metric(POOL_REQUEST_TYPE, "borrow", time.perf_counter_ns() - start_time)
+        return client
+
+    def release(self, client, broken=False):
+        """Return a connection. Broken ones (task failed in the middle) and ones with an open
+        transaction (custom_timer swallows the exception of a failed one) are rolled back first"""
+        now = time.monotonic()
+        try:
+            if broken or client.trx_log is not None:
+                try:
+                    client.trx_rollback()
+                except Exception:
+                    self._close(client)
+                    return
+            if self.max_lifetime and now - client.pool_created > self.max_lifetime:
+                self._close(client)
+                return
+            client.pool_returned = now
+            self.idle.append(client)
+        finally:
+            self.slots.release()
+
+    def _keepalive(self, now):
+        """Ping connections idle for more than db_config keepalive seconds, close broken ones"""
+        for client in [
+            c
+            for c in self.idle
+            if c.keepalive and now - max(c.pool_returned, c.pool_pinged) > c.keepalive
+        ]:
+            self.idle.remove(client)  # not borrowed while pinged
+            client.pool_pinged = now
+            if client.ping():
+                self.idle.appendleft(client)
+            else:
+                self._close(client)
+
+    def _maintain(self):
+        """Close idle and expired connections, ping idle ones, keep at least min_size open"""
+        while True:
+            gevent.sleep(MAINTENANCE_INTERVAL_SEC)
+            now = time.monotonic()
+            while (
+                self.idle
+                and self.size > self.min_size
+                and now - self.idle[0].pool_returned > self.idle_timeout
+            ):
+                self._close(self.idle.popleft())
+            if self.max_lifetime:
+                for client in [
+                    c for c in self.idle if now - c.pool_created > self.max_lifetime
+                ]:
+                    self.idle.remove(client)
+                    self._close(client)
+            self._keepalive(now)
+            try:
+                while self.size < self.min_size:
+                    self.idle.appendleft(self._new_client())
+            except Exception as e:
+                logger.error(f"Connection pool failed to open connection: {e}")
+
+
+class PooledClient:
+    """Per-user view of the pool with MySqlClient API
+
+    The connection is borrowed on first use within a task and returned by CustomTasks after the task
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.client = None
+
+    def acquire(self):
+        if self.client is None:
+            self.client = self.pool.borrow()
+        return self.client
+
+    def release(self, broken=False):
+        if self.client is not None:
+            client, self.client = self.client, None
+            self.pool.release(client, broken)
+
+    def close(self):
+        """Users do not close pooled connections, they return them"""
+        self.release()
+
+    def __getattr__(self, name):
+        return getattr(self.acquire(), name)
+
+
+_pool = None
+
+
+def get_pool(db_config: dict, client_class=MySqlClient, **pool_config) -> ConnectionPool:
+    """The pool of this worker process"""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(db_config, client_class=client_class, **pool_config)
+    return _pool
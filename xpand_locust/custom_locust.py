@@ -1,3 +1,4 @@
+import heapq
 import logging
 import sys
 import time
@@ -14,8 +15,14 @@ from locust.runners import (
     WorkerRunner,
 )
 
+from .connect_ramp import configure_ramp, get_ramp, wait_ramp
+from .connection_pool import PooledClient, get_pool
+from .custom_timer import attach_stats, attach_stats_buffer
+from .io_stats import io_stats
+from .key_generators import set_worker
 from .locust_utils import histogram, load_yaml_config
 from .mysql_client import MySqlClient
+from .stats_buffer import StatsBuffer
 
 all_users_spawned = Semaphore()
 all_users_spawned.acquire()
@@ -23,9 +30,6 @@ all_users_spawned.acquire()
 
 logger = logging.getLogger(__name__)
 
-# TODO
-# 'total_content_length': 0  - I need to send number of rows returned by methods
-
 # ToDO socket.setdefaulttimeout(150)
 
 # TODO
@@ -77,6 +81,20 @@ def _(parser):
         include_in_web_ui=False,
         help="produce latency histogram after test end",
     )
+    parser.add_argument(
+        "--worker-index",
+        type=int,
+        default=0,
+        include_in_web_ui=False,
+        help="index of this worker (0 based), for partitioned keys. Set by swarm_runner.py",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        include_in_web_ui=False,
+        help="number of workers, for partitioned keys. Set by swarm_runner.py",
+    )
 
 
 @events.init.add_listener
@@ -90,6 +108,31 @@ def _(environment, **kw):
 def _(environment, **kw):
     if not isinstance(environment.runner, MasterRunner):
         custom_params.load_config(environment.parsed_options.params)
+        set_worker(environment.parsed_options.worker_index, environment.parsed_options.workers)
+        attach_stats(environment.runner.stats)
+        flush_interval_ms = custom_params.get_params("stats_flush_interval_ms")
+        if flush_interval_ms:
+            stats_buffer = StatsBuffer(environment.runner.stats, flush_interval_ms)
+            stats_buffer.start(environment)
+            attach_stats_buffer(stats_buffer)
+        ramp_config = custom_params.get_params("connect_ramp")
+        if ramp_config:
+            configure_ramp(**ramp_config)
+
+    # Rows affected and bytes received, after StatsBuffer has flushed them
+    environment.events.reset_stats.add_listener(io_stats.reset)
+    if isinstance(environment.runner, WorkerRunner):
+        environment.events.report_to_master.add_listener(io_stats.on_report_to_master)
+    else:
+        if isinstance(environment.runner, MasterRunner):
+            environment.events.worker_report.add_listener(io_stats.on_worker_report)
+
+        @environment.events.quitting.add_listener
+        def on_quitting(**kw):
+            io_stats.print_stats(environment.runner.stats)
+            csv_prefix = getattr(environment.parsed_options, "csv_prefix", None)
+            if csv_prefix:
+                io_stats.write_csv(environment.runner.stats, csv_prefix)
 
     # TODO: stop for certain fail % or latency or number of requests
     # https://docs.locust.io/en/stable/extending-locust.html#run-a-background-greenlet
@@ -152,12 +195,32 @@ class CustomTasks(TaskSet):
         self.tasks = new_tasks
 
         all_users_spawned.wait()
+        wait_ramp()  # all users are connected
         self.wait()
         # From https://github.com/locustio/locust/blob/c3d1a49cda02660de14ddc25130673db9fae440a/locust/web.py
         self.user.environment.events.reset_stats.fire()
         self.user.environment.runner.stats.reset_all()
         self.user.environment.runner.exceptions = {}
 
+    def _sleep(self, seconds):
+        # wait_time between tasks, db_config keepalive pings the idle connection meanwhile
+        if isinstance(self.client, MySqlClient) and self.client.keepalive:
+            self.client.idle(seconds)
+        else:
+            super(CustomTasks, self)._sleep(seconds)
+
+    def execute_task(self, task):
+        # Pooled connection is held for one task only
+        release = getattr(self.client, "release", None)
+        if release is None:
+            return super(CustomTasks, self).execute_task(task)
+        try:
+            super(CustomTasks, self).execute_task(task)
+        except BaseException:
+            release(broken=True)
+            raise
+        release()
+
 
 # TODO - wait for all users
 # https://github.com/locustio/locust/blob/master/examples/semaphore_wait.py
@@ -165,16 +228,52 @@ class CustomTasks(TaskSet):
 
 class CustomLocust(User):
     abstract = True
+    preconnect = False  # client connects in on_start (or on first use) through the connect ramp
+    users_started = 0  # user indexes handed out in this worker process so far
+    free_user_indexes = []  # heap of indexes of stopped users
 
     def __init__(self, *args, **kwargs):
         super(CustomLocust, self).__init__(*args, **kwargs)
+        # index of the user in this worker process (0 based), for partitioned keys.
+        # The lowest index of a stopped user is reused, so respawned users stay below users_per_worker
+        if CustomLocust.free_user_indexes:
+            self.user_index = heapq.heappop(CustomLocust.free_user_indexes)
+        else:
+            self.user_index = CustomLocust.users_started
+            CustomLocust.users_started += 1
         db_config = custom_params.get_params("db_config")
+        pool_config = custom_params.get_params("connection_pool")
         try:
-            self.client = CustomClient(**db_config)
+            if pool_config:
+                self.client = PooledClient(
+                    get_pool(db_config, client_class=CustomClient, **pool_config)
+                )
+            elif get_ramp() is not None:  # connects in on_start, at the rate of connect ramp
+                self.client = CustomClient(lazy_connect=True, **db_config)
+                self.preconnect = True
+            else:
+                self.client = CustomClient(**db_config)
         except Exception as e:
             logger.error(f"Fatal error has happened {e}")
             self.environment.runner.stop()
 
+    def on_start(self):
+        # Connect ramp. Users that override on_start without calling it connect on their first statement
+        if self.preconnect:
+            ramp = get_ramp()
+            ramp.register()
+            try:
+                ramp.preconnect(self.client)
+            except Exception as e:
+                logger.error(f"Fatal error has happened {e}")
+                self.environment.runner.stop()
+
+    def on_stop(self):
+        # Hand the user index back, call it when you override on_stop
+        if self.user_index is not None:
+            heapq.heappush(CustomLocust.free_user_indexes, self.user_index)
+            self.user_index = None
+
 
 class CustomClient(MySqlClient):
     def __init__(self, *args, **kwargs):
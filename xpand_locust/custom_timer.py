@@ -2,56 +2,316 @@
 # -*- coding: utf-8 -*-
 # Copyright (C) 2020 dvolkov
 
-import inspect
 import sys
-import time
+from functools import partial, wraps
+from time import perf_counter_ns
 
+from gevent.local import local
 from locust import events
 
+from .io_stats import log_io
 
-def custom_timer(func):
+NS_PER_MS = 1_000_000
+SPAN_REQUEST_TYPE = "SPAN"
+
+
+class Span:
+    """Transaction opened by custom_timer(spans=True)
+
+    Statements executed inside it are reported as "<transaction>/<statement>"
+    """
+
+    __slots__ = ("name", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.children = {}
+
+    def child_name(self, statement):
+        name = self.children.get(statement)
+        if name is None:
+            name = self.children[statement] = f"{self.name}/{statement}"
+        return name
+
+
+class _ActiveSpan(local):
+    """Span of the current greenlet (user)"""
+
+    span = None
+
+
+class _IoCounters(local):
+    """Rows and bytes of all statements run by the current greenlet (user), cumulative
+
+    MySqlClient adds to them, custom_timer reports the difference over the timed call
+    """
+
+    rows = 0  # returned
+    rows_affected = 0
+    bytes = 0  # received from the server, pymysql driver only
+
+
+_active = _ActiveSpan()
+io_counters = _IoCounters()
+_direct_stats = None
+_stats_buffer = None
+
+
+def attach_stats(stats):
+    """Child spans and client metrics are logged directly into RequestStats entries, bypassing Aggregated"""
+    global _direct_stats
+    _direct_stats = stats
+
+
+def current_transaction_name():
+    """Name of the custom_timer(spans=True) transaction of the current greenlet, if any"""
+    span = _active.span
+    return span.name if span is not None else None
+
+
+def attach_stats_buffer(stats_buffer):
+    """Send timings to StatsBuffer instead of firing request events one by one"""
+    global _stats_buffer
+    _stats_buffer = stats_buffer
+
+
+def request_name(func):
+    """Default request name for decorated function: _new_order -> new_order"""
+    return func.__name__.lstrip("_") or func.__name__
+
+
+def custom_timer(
+    func=None, *, name=None, request_type="CUSTOM", from_caller=False, spans=False
+):
     """
     Measure time and send to Locust
     https://docs.locust.io/en/stable/api.html#events
-    """
 
-    def func_wrapper(*args, **kwargs):
-        """wrap functions and measure time"""
+    Request name is resolved once, at decoration time: either explicit name=
+    or the name of decorated function. With from_caller=True the name of the calling
+    function is used instead (MySqlClient.query & co report under the task name this way)
 
-        previous_frame = inspect.currentframe().f_back
-        (filename, line_number, function_name, lines, index) = inspect.getframeinfo(
-            previous_frame
+        @custom_timer
+        def _new_order(self): ...
+
+        @custom_timer(name="payment")
+        def _payment(self): ...
+
+    With spans=True every MySqlClient statement executed inside the function
+    is also reported as a child span "SPAN <transaction>/<statement>"
+    """
+    if func is None:
+        return partial(
+            custom_timer,
+            name=name,
+            request_type=request_type,
+            from_caller=from_caller,
+            spans=spans,
         )
 
-        start_time = time.time()
-        result = None
-        clf = args[0]  # Class instance og the calling function.
+    fixed_name = None if from_caller else (name or request_name(func))
+    fixed_span = Span(fixed_name) if spans and fixed_name else None
+    request_success = events.request_success
+    request_failure = events.request_failure
+    get_frame = sys._getframe
+
+    @wraps(func)
+    def func_wrapper(*args, **kwargs):
+        """wrap functions and measure time"""
+        function_name = fixed_name or get_frame(1).f_code.co_name
+        if spans:
+            previous_span = _active.span
+            _active.span = fixed_span or Span(function_name)
+        io = io_counters
+        rows, rows_affected, received = io.rows, io.rows_affected, io.bytes
+        start_time = perf_counter_ns()
         try:
             result = func(*args, **kwargs)
-            if result is not None:
-                result_len = result if isinstance(result, int) else len(result)
-            else:
-                result_len = 0
-
         except Exception as e:
-            total_time = (time.time() - start_time) * 1000
-            events.request_failure.fire(
-                request_type="CUSTOM",
+            duration = perf_counter_ns() - start_time
+            if _stats_buffer is not None:
+                _stats_buffer.record(
+                    request_type, function_name, start_time, duration, 0, e
+                )
+                return None
+            request_failure.fire(
+                request_type=request_type,
                 name=function_name,
-                response_time=total_time,
+                response_time=duration / NS_PER_MS,
                 exception=e,
                 response_length=0,
                 request_id="none",
-            )  ##   clf.ps.request_id or "none")
+            )
+            return None
+        finally:
+            if spans:
+                _active.span = previous_span
+        duration = perf_counter_ns() - start_time
+        rows = io.rows - rows
+        rows_affected = io.rows_affected - rows_affected
+        received = io.bytes - received
+        if rows or rows_affected or received:
+            result_len = rows  # response length of database requests is rows returned
+        elif result is None:
+            result_len = 0
+        elif isinstance(result, int):
+            result_len = result
         else:
-            total_time = (time.time() - start_time) * 1000
-            events.request_success.fire(
-                request_type="CUSTOM",
-                name=function_name,
-                response_time=total_time,
-                response_length=result_len,  # clf.ps.content_length
-                request_id="none",
+            result_len = len(result)
+        if _stats_buffer is not None:
+            _stats_buffer.record(
+                request_type,
+                function_name,
+                start_time,
+                duration,
+                result_len,
+                rows_affected=rows_affected,
+                bytes_received=received,
             )
+            return result
+        request_success.fire(
+            request_type=request_type,
+            name=function_name,
+            response_time=duration / NS_PER_MS,
+            response_length=result_len,
+            request_id="none",
+        )
+        if (rows_affected or received) and _direct_stats is not None:
+            log_io(_direct_stats, function_name, request_type, rows_affected, received)
         return result
 
     return func_wrapper
+
+
+def report_request(request_type, name, start_time, duration, result=None, exception=None):
+    """Send one timing to StatsBuffer or fire the locust request event"""
+    if exception is None:
+        if result is None:
+            result_len = 0
+        elif isinstance(result, int):
+            result_len = result
+        else:
+            result_len = len(result)
+    else:
+        result_len = 0
+    if _stats_buffer is not None:
+        _stats_buffer.record(
+            request_type, name, start_time, duration, result_len, exception
+        )
+    elif exception is None:
+        events.request_success.fire(
+            request_type=request_type,
+            name=name,
+            response_time=duration / NS_PER_MS,
+            response_length=result_len,
+            request_id="none",
+        )
+    else:
+        events.request_failure.fire(
+            request_type=request_type,
+            name=name,
+            response_time=duration / NS_PER_MS,
+            exception=exception,
+            response_length=0,
+            request_id="none",
+        )
+
+
+def async_custom_timer(
+    func=None, *, name=None, request_type="CUSTOM", from_caller=False, result_length=None
+):
+    """custom_timer for coroutines (AsyncMySqlClient, AsyncTasks). Spans are not supported
+
+    result_length(result) is the response length, default: the result if int, else len(result)
+    """
+    if func is None:
+        return partial(
+            async_custom_timer,
+            name=name,
+            request_type=request_type,
+            from_caller=from_caller,
+            result_length=result_length,
+        )
+
+    fixed_name = None if from_caller else (name or request_name(func))
+    get_frame = sys._getframe
+
+    @wraps(func)
+    async def func_wrapper(*args, **kwargs):
+        """wrap coroutines and measure time"""
+        function_name = fixed_name or get_frame(1).f_code.co_name
+        start_time = perf_counter_ns()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            report_request(
+                request_type,
+                function_name,
+                start_time,
+                perf_counter_ns() - start_time,
+                exception=e,
+            )
+            return None
+        report_request(
+            request_type,
+            function_name,
+            start_time,
+            perf_counter_ns() - start_time,
+            result if result_length is None else result_length(result),
+        )
+        return result
+
+    return func_wrapper
+
+
+def log_metric(request_type, name, duration, length=0, exception=None):
+    """Log an internal measurement (pool borrow wait, ...) that is not a request of the workload"""
+    if _direct_stats is None:
+        return
+    entry = _direct_stats.get(name, request_type)
+    entry.log(duration / NS_PER_MS, length)
+    if exception is not None:
+        entry.log_error(exception)
+
+
+def log_child_span(statement, duration, exception=None):
+    """Log a statement timed by the caller (pipelined statements) as a child span of the active transaction"""
+    span = _active.span
+    if span is None or _direct_stats is None:
+        return
+    entry = _direct_stats.get(span.child_name(statement), SPAN_REQUEST_TYPE)
+    entry.log(duration / NS_PER_MS, 0)
+    if exception is not None:
+        entry.log_error(exception)
+
+
+def child_span(func=None, *, name=None):
+    """
+    Record the call as a child span of the active custom_timer(spans=True) transaction.
+    Statement name is name= or the name of the calling function (point_selects, ...)
+    Outside of a transaction the call is not measured at all
+    """
+    if func is None:
+        return partial(child_span, name=name)
+
+    get_frame = sys._getframe
+
+    @wraps(func)
+    def span_wrapper(*args, **kwargs):
+        span = _active.span
+        if span is None or _direct_stats is None:
+            return func(*args, **kwargs)
+        entry = _direct_stats.get(
+            span.child_name(name or get_frame(1).f_code.co_name), SPAN_REQUEST_TYPE
+        )
+        start_time = perf_counter_ns()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            entry.log((perf_counter_ns() - start_time) / NS_PER_MS, 0)
+            entry.log_error(e)
+            raise
+        entry.log((perf_counter_ns() - start_time) / NS_PER_MS, 0)
+        return result
+
+    return span_wrapper
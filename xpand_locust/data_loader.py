@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Prepare phase: create tables and fill them with generated rows before the test.
+# Rows are generated with NumPy in batches, formatted in memory and sent with
+# LOAD DATA LOCAL INFILE straight from the buffer (no temp files). Key ranges of all tables
+# are split into chunks and spread over a pool of processes, each with its own connection.
+#
+# ./bin/swarm_runner.py --swarm-config swarm_config.yaml -f locustfile_simple.py prepare --params params.yaml
+#
+# params.yaml:
+# prepare:
+#   processes: 8 # default: number of cores
+#   batch_rows: 50000 # rows per LOAD DATA statement
+#   chunk_rows: 1000000 # rows generated by one process in one go
+#   seed: 1 # same seed - same data
+#   tables:
+#     - name: sbtest{n} # {n} is replaced with table number 1..count
+#       count: 10
+#       rows: 1000000
+#       create: # run before loading
+#         - DROP TABLE IF EXISTS sbtest{n}
+#         - CREATE TABLE sbtest{n} (id INTEGER NOT NULL, k INTEGER NOT NULL, PRIMARY KEY (id))
+#       after_load: # run after loading, secondary indexes are cheaper to build at the end
+#         - CREATE INDEX k_{n} ON sbtest{n} (k)
+#       columns: # in the order of LOAD DATA column list
+#         id: sequence # 1..rows
+#         k: {int: [1, 1000000]} # uniform random, both ends included
+#         c: {pattern: "###-@@@"} # '#' random digit, '@' random lowercase letter, anything else as is
+#         status: {choice: [new, paid, shipped]}
+#
+# Generated values must not contain tabs, newlines or backslashes. Loading needs the pymysql driver.
+
+import logging
+import multiprocessing
+import os
+import time
+from itertools import count
+
+import numpy as np
+import pymysql.connections
+
+from .locust_utils import load_yaml_config
+from .mysql_client import MySqlClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_ROWS = 50_000
+DEFAULT_CHUNK_ROWS = 1_000_000
+PACKET_SIZE = 1 << 20  # LOAD DATA payload is sent in packets of up to 1MB
+BUFFER_NAME_PREFIX = "xpand_locust_buffer"
+
+
+class LoaderException(Exception):
+    """Bad prepare: section in params file or failed loader process"""
+
+
+# In-memory "files" served to LOAD DATA LOCAL INFILE, keyed by the name the server asks for
+_buffers = {}
+_buffer_ids = count()
+
+
+class BufferLoadLocalFile(pymysql.connections.LoadLocalFile):
+    """Send a registered in-memory buffer instead of reading a local file
+
+    Local files are never read: with local_infile the server (or a proxy) may ask for any file name
+    """
+
+    def send_data(self):
+        # kept until load_buffer returns: a retried statement asks for the same buffer again
+        data = _buffers.get(self.filename)
+        conn = self.connection
+        if data is None:
+            conn.write_packet(b"")  # no data, the statement is completed by the server
+            raise pymysql.err.OperationalError(
+                1017, f"Refused to send {self.filename!r}, it is not a loader buffer"
+            )
+        packet_size = min(conn.max_allowed_packet, PACKET_SIZE)
+        view = memoryview(data)
+        try:
+            for offset in range(0, len(view), packet_size):
+                conn.write_packet(view[offset : offset + packet_size])
+        finally:
+            # the empty packet signifies we are done sending data
+            conn.write_packet(b"")
+
+
+def load_buffer(client: MySqlClient, table: str, columns: list, data: bytes) -> int:
+    """LOAD DATA LOCAL INFILE from tab separated rows in data, returns number of loaded rows"""
+    name = f"{BUFFER_NAME_PREFIX}_{os.getpid()}_{next(_buffer_ids)}"
+    _buffers[name.encode()] = data
+    try:
+        return client._execute(
+            f"LOAD DATA LOCAL INFILE '{name}' INTO TABLE {table} ({', '.join(columns)})",
+            None,
+        )
+    finally:
+        _buffers.pop(name.encode(), None)
+
+
+def _pattern_column(rng, pattern: str, rows: int):
+    template = np.frombuffer(pattern.encode(), dtype=np.uint8)
+    values = np.tile(template, (rows, 1))
+    for placeholder, low, high in ((b"#", b"0", b"9"), (b"@", b"a", b"z")):
+        positions = template == ord(placeholder)
+        values[:, positions] = rng.integers(
+            ord(low), ord(high) + 1, size=(rows, positions.sum()), dtype=np.uint8
+        )
+    return values.view(f"S{len(template)}").ravel()
+
+
+def generate_column(rng, spec, start: int, end: int):
+    """Values of rows start..end-1 (0 based) of one column as a bytes array"""
+    rows = end - start
+    if spec == "sequence":
+        return np.arange(start + 1, end + 1).astype("S20")
+    if isinstance(spec, dict) and len(spec) == 1:
+        kind, args = next(iter(spec.items()))
+        if kind == "int":
+            low, high = args
+            return rng.integers(low, high + 1, size=rows).astype("S20")
+        if kind == "pattern":
+            return _pattern_column(rng, args, rows)
+        if kind == "choice":
+            values = np.array([str(value).encode() for value in args])
+            return values[rng.integers(0, len(values), size=rows)]
+    raise LoaderException(
+        f"Unknown column generator {spec}, supported are: sequence, int, pattern, choice"
+    )
+
+
+def generate_rows(rng, columns: dict, start: int, end: int) -> bytes:
+    """Tab separated rows in LOAD DATA default format"""
+    values = [generate_column(rng, spec, start, end) for spec in columns.values()]
+    lines = values[0]
+    for column in values[1:]:
+        lines = np.char.add(np.char.add(lines, b"\t"), column)
+    return b"\n".join(lines.tolist()) + b"\n"
+
+
+def _init_process(log_level, db_config: dict) -> MySqlClient:
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=log_level,
+    )
+    pymysql.connections.LoadLocalFile = BufferLoadLocalFile
+    return MySqlClient(**dict(db_config, local_infile=True))
+
+
+def _load_chunks(log_level, chunks: list, db_config: dict, batch_rows: int, seed):
+    """Loader process: generate and load its share of key ranges"""
+    client = _init_process(log_level, db_config)
+    for table, columns, start, end, chunk_number in chunks:
+        start_time = time.monotonic()
+        rng = np.random.default_rng(None if seed is None else (seed, chunk_number))
+        for batch_start in range(start, end, batch_rows):
+            batch_end = min(batch_start + batch_rows, end)
+            data = generate_rows(rng, columns, batch_start, batch_end)
+            load_buffer(client, table, list(columns), data)
+            client.trx_commit()
+        elapsed = time.monotonic() - start_time
+        logger.info(
+            f"{table}: rows {start + 1}..{end} loaded in {elapsed:.1f}s, {(end - start) / elapsed:.0f} rows/s"
+        )
+    client.close()
+
+
+def _run_statements(log_level, tables: list, db_config: dict):
+    """after_load process: statement lists of its share of tables"""
+    client = _init_process(log_level, db_config)
+    for statements in tables:
+        for statement in statements:
+            logger.info(statement)
+            client._execute(statement, None)
+    client.close()
+
+
+def _run_in_processes(target, log_level, jobs: list, processes: int, *args):
+    """Spread jobs round robin over processes and wait for all of them
+
+    Plain spawned processes: multiprocessing pools do not mix with gevent monkey patching
+    """
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for i in range(min(processes, len(jobs))):
+        process = context.Process(
+            target=target, args=(log_level, jobs[i::processes]) + args
+        )
+        process.start()
+        workers.append(process)
+    failed = 0
+    for process in workers:
+        process.join()
+        if process.exitcode != 0:
+            failed += 1
+    if failed:
+        raise LoaderException(f"{failed} loader processes have failed, see the log above")
+
+
+def table_instances(table: dict):
+    """(table name, number) for every copy of table config"""
+    for n in range(1, table.get("count", 1) + 1):
+        yield table["name"].replace("{n}", str(n)), n
+
+
+def prepare(params_file: str, processes: int = None, log_level="INFO"):
+    """Create tables and load them as described by the prepare: section of params file"""
+    params = load_yaml_config(params_file)
+    db_config = params.get("db_config")
+    config = params.get("prepare")
+    if not config or not config.get("tables"):
+        raise LoaderException(f"No prepare: tables in {params_file}")
+    if db_config.get("driver", "pymysql") != "pymysql":
+        raise LoaderException("Loading needs the pymysql driver")
+    processes = processes or config.get("processes") or os.cpu_count()
+    batch_rows = config.get("batch_rows", DEFAULT_BATCH_ROWS)
+    chunk_rows = config.get("chunk_rows", DEFAULT_CHUNK_ROWS)
+
+    client = MySqlClient(**db_config)
+    chunks, after_load, total_rows = [], [], 0
+    for table in config["tables"]:
+        for name, n in table_instances(table):
+            for statement in table.get("create", []):
+                logger.info(statement.replace("{n}", str(n)))
+                client._execute(statement.replace("{n}", str(n)), None)
+            for start in range(0, table["rows"], chunk_rows):
+                end = min(start + chunk_rows, table["rows"])
+                chunks.append((name, table["columns"], start, end, len(chunks)))
+            # one job per table: its statements run in order, tables in parallel
+            statements = [
+                statement.replace("{n}", str(n)) for statement in table.get("after_load", [])
+            ]
+            if statements:
+                after_load.append(statements)
+            total_rows += table["rows"]
+    client.close()
+
+    start_time = time.monotonic()
+    logger.info(f"Loading {total_rows} rows in {len(chunks)} chunks by {processes} processes")
+    _run_in_processes(
+        _load_chunks, log_level, chunks, processes, db_config, batch_rows, config.get("seed")
+    )
+    elapsed = time.monotonic() - start_time
+    logger.info(f"Loaded {total_rows} rows in {elapsed:.1f}s, {total_rows / elapsed:.0f} rows/s")
+
+    if after_load:
+        _run_in_processes(_run_statements, log_level, after_load, processes, db_config)
+        logger.info(
+            f"After load statements done in {time.monotonic() - start_time - elapsed:.1f}s"
+        )
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Database driver backends for MySqlClient. Select one with the driver: key in db_config:
+#   pymysql  - pure python PyMySQL (default), cooperative with gevent
+#   mysqlclient - MySQLdb, C extension on top of libmysqlclient/libmariadb
+#   mariadb - MariaDB Connector/Python on top of Connector/C
+# C drivers parse packets and rows in C, but their network calls block the gevent hub:
+# a worker process with such driver should run few users (use more worker processes instead)
+# pymysql and mysqlclient connections accept several statements in one query (CLIENT_MULTI_STATEMENTS),
+# MySqlClient.pipeline() sends them in one round trip
+
+import importlib
+from time import perf_counter_ns
+
+
+class DriverException(Exception):
+    """Unknown or not installed driver"""
+
+
+class _CountingReader:
+    """Packet reader of a pymysql connection that adds bytes read to counters.bytes"""
+
+    __slots__ = ("file", "counters")
+
+    def __init__(self, file, counters):
+        self.file = file
+        self.counters = counters
+
+    def read(self, size):
+        data = self.file.read(size)
+        self.counters.bytes += len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+_ssl_contexts = {}
+# (context, host, port) -> TLS session of the last connection, to resume it on reconnect
+_tls_sessions = {}
+
+
+def ssl_context(config: dict):
+    """One SSLContext per process and ssl config, set up the way pymysql does it
+
+    TLS sessions can be resumed only with the context that has created them.
+    With session_resumption: False in the ssl config every connect does a full handshake
+    """
+    key = tuple(sorted(config.items()))
+    ctx = _ssl_contexts.get(key)
+    if ctx is None:
+        import ssl
+
+        ca, capath = config.get("ca"), config.get("capath")
+        hasnoca = ca is None and capath is None
+        ctx = ssl.create_default_context(cafile=ca, capath=capath)
+        ctx.check_hostname = not hasnoca and config.get("check_hostname", True)
+        verify_mode = config.get("verify_mode")
+        if verify_mode is None:
+            ctx.verify_mode = ssl.CERT_NONE if hasnoca else ssl.CERT_REQUIRED
+        else:
+            ctx.verify_mode = ssl.CERT_REQUIRED if verify_mode else ssl.CERT_NONE
+        if config.get("cert"):
+            ctx.load_cert_chain(config["cert"], keyfile=config.get("key"))
+        if config.get("cipher"):
+            ctx.set_ciphers(config["cipher"])
+        ctx.session_resumption = config.get("session_resumption", True)
+        _ssl_contexts[key] = ctx
+    return ctx
+
+
+class _TimedSSLContext:
+    """SSLContext of a pymysql connection that times the TLS handshake and resumes TLS sessions"""
+
+    __slots__ = ("ctx", "conn", "session_key")
+
+    def __init__(self, ctx, conn):
+        self.ctx = ctx
+        self.conn = conn
+        self.session_key = None
+        if getattr(ctx, "session_resumption", False):
+            self.session_key = (ctx, conn.host, conn.port)
+
+    def wrap_socket(self, sock, **kwargs):
+        if self.session_key is not None:
+            kwargs["session"] = _tls_sessions.get(self.session_key)
+        start_time = perf_counter_ns()
+        sock = self.ctx.wrap_socket(sock, **kwargs)
+        phase = "tls_resumed" if sock.session_reused else "tls"
+        self.conn.connect_phases[phase] = perf_counter_ns() - start_time
+        return sock
+
+    def save_session(self, sock):
+        # TLS 1.3 session tickets arrive after the handshake, take the session once connected
+        if self.session_key is not None and sock.session is not None:
+            _tls_sessions[self.session_key] = sock.session
+
+
+def timed_connection_class(connection_class):
+    """pymysql Connection recording connect phases in connect_phases, ns:
+    tcp - TCP connect, tls or tls_resumed - TLS handshake (full or resumed session),
+    auth - greeting, authentication and session setup
+    """
+
+    class TimedConnection(connection_class):
+        connect_phases = {}
+
+        def connect(self, sock=None):
+            self.connect_phases = {}
+            if self.ssl and not isinstance(self.ctx, _TimedSSLContext):
+                self.ctx = _TimedSSLContext(self.ctx, self)
+            self._connect_start = perf_counter_ns()
+            super().connect(sock)
+            if self.ssl and self._secure and self.unix_socket is None:
+                self.ctx.save_session(self._sock)
+            phases = self.connect_phases
+            phases["auth"] = (
+                perf_counter_ns() - self._connect_start - sum(phases.values())
+            )
+
+        def _get_server_information(self):
+            # called right after the socket is connected, greeting is the first packet
+            self.connect_phases["tcp"] = perf_counter_ns() - self._connect_start
+            super()._get_server_information()
+
+    return TimedConnection
+
+
+class Driver:
+    """DB-API 2 module wrapper: connect, dict cursor and error codes"""
+
+    module_name = None
+    supports_prepared = False
+    supports_pipeline = True
+
+    def __init__(self):
+        try:
+            self.module = importlib.import_module(self.module_name)
+        except ImportError as e:
+            raise DriverException(
+                f"Driver module {self.module_name} is not installed: {e}"
+            )
+        self.Error = self.module.Error
+        self.InterfaceError = self.module.InterfaceError
+
+    def connect_params(self, params: dict) -> dict:
+        """Translate db_config into driver connect() arguments"""
+        return params
+
+    def connect(self, **params):
+        return self.module.connect(**self.connect_params(params))
+
+    def cursor(self, conn, dict_rows=True):
+        """Buffered cursor returning rows as dicts or as plain tuples"""
+        raise NotImplementedError
+
+    def unbuffered_cursor(self, conn, dict_rows=True):
+        """Cursor streaming rows from the server instead of reading the whole result set"""
+        raise NotImplementedError
+
+    def prepared_cursor(self, conn, dict_rows=True):
+        """Cursor executing one server side prepared statement over the binary protocol"""
+        raise DriverException(
+            f"Prepared statements are not supported by {self.module_name}, use driver: mariadb"
+        )
+
+    def count_bytes(self, conn, counters):
+        """Add bytes received on conn to counters.bytes, if the driver lets us see them"""
+
+    def connect_phases(self, conn) -> dict:
+        """Durations of connect phases of conn in ns (tcp, tls, auth), empty if the driver hides them"""
+        return {}
+
+    def mogrify(self, cur, query, params) -> str:
+        """Query text with params interpolated client side, the way execute() sends it"""
+        return cur.mogrify(query, params)
+
+    def begin(self, conn):
+        conn.begin()
+
+    def ping(self, conn):
+        """Round trip to the server, raises if the connection is gone. Never reconnects by itself"""
+        conn.ping()
+
+    def errno(self, e) -> int:
+        """Numeric server/client error code of an exception, 0 if unknown"""
+        if e.args and isinstance(e.args[0], int):
+            return e.args[0]
+        return 0
+
+
+class PyMySQLDriver(Driver):
+    module_name = "pymysql"
+
+    def __init__(self):
+        super().__init__()
+        self.connection_class = timed_connection_class(self.module.connections.Connection)
+
+    def connect(self, **params):
+        return self.connection_class(**self.connect_params(params))
+
+    def connect_phases(self, conn):
+        return conn.connect_phases
+
+    def ping(self, conn):
+        conn.ping(reconnect=False)
+
+    def connect_params(self, params):
+        import pymysql.cursors
+        from pymysql.constants import CLIENT
+
+        params = params.copy()
+        params.setdefault("cursorclass", pymysql.cursors.DictCursor)
+        params["client_flag"] = params.get("client_flag", 0) | CLIENT.MULTI_STATEMENTS
+        if isinstance(params.get("ssl"), dict) and params["ssl"]:
+            params["ssl"] = ssl_context(params["ssl"])
+        return params
+
+    def cursor(self, conn, dict_rows=True):
+        import pymysql.cursors
+
+        return conn.cursor(
+            pymysql.cursors.DictCursor if dict_rows else pymysql.cursors.Cursor
+        )
+
+    def count_bytes(self, conn, counters):
+        # every packet header and payload is read by Connection._read_bytes() from _rfile
+        conn._rfile = _CountingReader(conn._rfile, counters)
+
+    def unbuffered_cursor(self, conn, dict_rows=True):
+        import pymysql.cursors
+
+        return conn.cursor(
+            pymysql.cursors.SSDictCursor if dict_rows else pymysql.cursors.SSCursor
+        )
+
+
+class MySQLdbDriver(Driver):
+    module_name = "MySQLdb"
+
+    def connect_params(self, params):
+        import MySQLdb.cursors
+
+        params = params.copy()
+        if not params.get("ssl"):
+            params.pop("ssl", None)
+        params.setdefault("cursorclass", MySQLdb.cursors.DictCursor)
+        return params
+
+    def cursor(self, conn, dict_rows=True):
+        import MySQLdb.cursors
+
+        return conn.cursor(
+            MySQLdb.cursors.DictCursor if dict_rows else MySQLdb.cursors.Cursor
+        )
+
+    def unbuffered_cursor(self, conn, dict_rows=True):
+        import MySQLdb.cursors
+
+        return conn.cursor(
+            MySQLdb.cursors.SSDictCursor if dict_rows else MySQLdb.cursors.SSCursor
+        )
+
+    # MySQLdb enables CLIENT_MULTI_STATEMENTS by default, Cursor.mogrify() needs mysqlclient 2.2+
+
+    def begin(self, conn):
+        conn.query("BEGIN")
+
+
+class MariaDBDriver(Driver):
+    module_name = "mariadb"
+    supports_prepared = True
+    supports_pipeline = False  # no client side parameter interpolation
+
+    def connect_params(self, params):
+        params = params.copy()
+        ssl = params.pop("ssl", None)
+        if ssl:
+            params["ssl"] = True
+            for key in ("ca", "cert", "key"):
+                if key in ssl:
+                    params[f"ssl_{key}"] = ssl[key]
+        return params
+
+    def cursor(self, conn, dict_rows=True):
+        return conn.cursor(dictionary=dict_rows)
+
+    def unbuffered_cursor(self, conn, dict_rows=True):
+        return conn.cursor(dictionary=dict_rows, buffered=False)
+
+    def prepared_cursor(self, conn, dict_rows=True):
+        # Statement is prepared on the first execute and re-executed while SQL text is the same
+        return conn.cursor(dictionary=dict_rows, prepared=True)
+
+    def errno(self, e):
+        return getattr(e, "errno", None) or super().errno(e)
+
+
+drivers = {
+    "pymysql": PyMySQLDriver,
+    "mysqlclient": MySQLdbDriver,
+    "mariadb": MariaDBDriver,
+}
+
+
+def get_driver(name: str = "pymysql") -> Driver:
+    try:
+        return drivers[name]()
+    except KeyError:
+        raise DriverException(
+            f"Unknown driver {name}, supported drivers are: {', '.join(drivers)}"
+        )
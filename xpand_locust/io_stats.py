@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Rows affected and bytes received per request name, kept next to locust stats.
+# Workers send them to master with every stats report, master (or standalone locust)
+# prints them at the end of the test and writes <csv prefix>_io.csv with --csv.
+#
+# Rows returned are the response length of locust stats. With patch/stats.py installed
+# as locust/stats.py, StatsEntry has its own rows affected and bytes counters and
+# the console and CSV files get rows/s and MB/s columns as well.
+
+import csv
+
+from locust.stats import StatsEntry
+
+IO_REPORT_KEY = "io_stats"
+# patch/stats.py is installed
+PATCHED_STATS = hasattr(StatsEntry, "log_io")
+
+
+class IoStats:
+    def __init__(self):
+        self.entries = {}  # (name, request type) -> [rows affected, bytes received]
+
+    def log(self, name, request_type, rows_affected, bytes_received):
+        entry = self.entries.get((name, request_type))
+        if entry is None:
+            entry = self.entries[(name, request_type)] = [0, 0]
+        entry[0] += rows_affected
+        entry[1] += bytes_received
+
+    def reset(self, *args, **kwargs):
+        self.entries = {}
+
+    def on_report_to_master(self, client_id, data):
+        """Worker: send counters collected since the last report"""
+        data[IO_REPORT_KEY] = [
+            [name, request_type, rows_affected, received]
+            for (name, request_type), (rows_affected, received) in self.entries.items()
+        ]
+        self.entries = {}
+
+    def on_worker_report(self, client_id, data):
+        """Master: add counters of a worker"""
+        for name, request_type, rows_affected, received in data.get(IO_REPORT_KEY, ()):
+            self.log(name, request_type, rows_affected, received)
+
+    def rows(self, stats):
+        """(type, name, rows returned, rows affected, bytes received, MB/s) per entry and for all of them"""
+        rows = []
+        totals = [0, 0, 0]
+        for (name, request_type), (rows_affected, received) in sorted(self.entries.items()):
+            entry = stats.get(name, request_type)
+            duration = (entry.last_request_timestamp or entry.start_time) - entry.start_time
+            rows.append(
+                (
+                    request_type,
+                    name,
+                    entry.total_content_length,
+                    rows_affected,
+                    received,
+                    received / duration / 1_000_000 if duration > 0 else 0,
+                )
+            )
+            totals[0] += entry.total_content_length
+            totals[1] += rows_affected
+            totals[2] += received
+        duration = (
+            stats.total.last_request_timestamp or stats.total.start_time
+        ) - stats.total.start_time
+        rows.append(
+            ("", "Aggregated", *totals, totals[2] / duration / 1_000_000 if duration > 0 else 0)
+        )
+        return rows
+
+    def print_stats(self, stats):
+        if not self.entries:
+            return
+        print(
+            f" {'Type':<8} {'Name':<60} {'rows returned':>14} {'rows affected':>14} {'bytes':>14} {'MB/s':>8}"
+        )
+        for request_type, name, returned, affected, received, mb_per_sec in self.rows(stats):
+            print(
+                f" {request_type:<8} {name[:60]:<60} {returned:>14} {affected:>14} {received:>14} {mb_per_sec:>8.2f}"
+            )
+
+    def write_csv(self, stats, csv_prefix):
+        if not self.entries:
+            return
+        with open(f"{csv_prefix}_io.csv", "wt", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                (
+                    "Type",
+                    "Name",
+                    "Total Rows Returned",
+                    "Total Rows Affected",
+                    "Total Bytes Received",
+                    "MB/s",
+                )
+            )
+            writer.writerows(self.rows(stats))
+
+
+io_stats = IoStats()
+
+
+def log_io(stats, name, request_type, rows_affected, bytes_received):
+    """Count rows affected and bytes received of a request of stats (RequestStats)"""
+    io_stats.log(name, request_type, rows_affected, bytes_received)
+    if PATCHED_STATS:
+        stats.get(name, request_type).log_io(rows_affected, bytes_received)
+        stats.total.log_io(rows_affected, bytes_received)
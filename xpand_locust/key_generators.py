@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Random keys (row ids, table numbers, ...) with the distributions of sysbench --rand-type.
+# Keys are drawn in large vectorized batches and handed out one by one, a call costs O(1).
+#
+# params.yaml:
+# keys:
+#   id: # key_generator("id", ...) in the locustfile
+#     distribution: zipfian # uniform (default), zipfian, pareto, gaussian, hotspot, sequence
+#     low: 1 # smallest key
+#     high: 1000000 # largest key, inclusive
+#     batch: 10000 # keys drawn at once
+#     seed: 1 # same seed - same keys, default: random
+#     theta: 0.8 # zipfian exponent, 0 < theta < 1 (sysbench --rand-zipfian-exp)
+#     h: 0.2 # pareto, share of keys getting 1 - h of the draws (sysbench --rand-pareto-h)
+#     stddev: 0.1 # gaussian, fraction of the key range around its middle
+#     hot_fraction: 0.01 # hotspot, share of keys that are hot (sysbench --rand-spec-pct)
+#     hot_probability: 0.75 # hotspot, share of draws hitting hot keys (sysbench --rand-spec-res)
+#     partition: worker # split the keys between workers (worker) or users (user), default: no split
+#     split: range # range - every worker (user) gets a contiguous range, stride - every n-th key
+#     users_per_worker: 100 # partition: user only, at least --users / number of workers
+#
+# zipfian, pareto and hotspot keys are hot at the low end of the range (of the partition).
+# sequence hands out every key of the range (of the partition) once, in order: unique keys for inserts.
+#
+# Partitions need the worker index and the number of workers (locust --worker-index and --workers,
+# set by swarm_runner.py). Key spaces of partitions do not overlap and seed gives every worker and
+# partition its own reproducible keys, so runs are repeatable and users do not collide on the same keys.
+
+import math
+
+import numpy as np
+
+DISTRIBUTIONS = ("uniform", "zipfian", "pareto", "gaussian", "hotspot", "sequence")
+PARTITIONS = ("worker", "user")
+SPLITS = ("range", "stride")
+DEFAULT_BATCH = 10000
+ZETA_EXACT_TERMS = 1_000_000  # zeta(n, theta) is summed exactly up to this, integrated above
+
+
+class KeyGeneratorException(Exception):
+    pass
+
+
+def zeta(n: int, theta: float) -> float:
+    """sum(1 / i ** theta for i in 1..n), the tail of large n is approximated by an integral"""
+    k = min(n, ZETA_EXACT_TERMS)
+    result = float(np.sum(np.arange(1, k + 1, dtype=np.float64) ** -theta))
+    if n > k:
+        result += ((n + 0.5) ** (1 - theta) - (k + 0.5) ** (1 - theta)) / (1 - theta)
+    return result
+
+
+class KeyGenerator:
+    """Endless random keys in [low, high] of one distribution
+
+    next_key = KeyGenerator("zipfian", 1, 1000000)
+    next_key()  # one key
+    next_key.draw(100)  # array of 100 keys
+
+    With parts > 1 only keys of partition part (0 based) of parts are returned:
+    range - the part-th of parts contiguous ranges, stride - low + part + i * parts.
+    seed is combined with worker (index of the worker process) and part
+    """
+
+    def __init__(
+        self,
+        distribution="uniform",
+        low=1,
+        high=1000000,
+        batch=DEFAULT_BATCH,
+        seed=None,
+        theta=0.8,
+        h=0.2,
+        stddev=0.1,
+        hot_fraction=0.01,
+        hot_probability=0.75,
+        part=0,
+        parts=1,
+        split="range",
+        worker=0,
+    ):
+        if distribution not in DISTRIBUTIONS:
+            raise KeyGeneratorException(
+                f"Unknown key distribution {distribution}, use one of {', '.join(DISTRIBUTIONS)}"
+            )
+        if split not in SPLITS:
+            raise KeyGeneratorException(
+                f"Unknown key split {split}, use one of {', '.join(SPLITS)}"
+            )
+        if not 0 <= part < parts:
+            raise KeyGeneratorException(f"Key partition {part} is out of {parts}")
+        total = high - low + 1
+        if split == "range":
+            self.size = total // parts
+            self.low, self.step = low + part * self.size, 1
+        else:
+            self.size = (total - part + parts - 1) // parts
+            self.low, self.step = low + part, parts
+        if self.size <= 0:
+            raise KeyGeneratorException(
+                f"Key range [{low}, {high}] is too small for {parts} partitions"
+            )
+        self.batch = batch
+        # every worker and partition draws its own keys, reproducible with seed
+        self.rng = np.random.default_rng(None if seed is None else [seed, worker, part])
+        self.position = 0  # next offset of sequence
+        self._draw = getattr(self, f"_{distribution}")
+        if distribution == "zipfian":
+            if not 0 < theta < 1:
+                raise KeyGeneratorException(f"zipfian theta must be in (0, 1), got {theta}")
+            self.theta = theta
+            self.zetan = zeta(self.size, theta)
+            self.eta = None  # 1 or 2 keys: ranks come from the thresholds of uz alone
+            if self.size > 2:
+                self.eta = (1 - (2 / self.size) ** (1 - theta)) / (
+                    1 - zeta(2, theta) / self.zetan
+                )
+        elif distribution == "pareto":
+            if not 0 < h < 1:
+                raise KeyGeneratorException(f"pareto h must be in (0, 1), got {h}")
+            self.power = math.log(h) / math.log(1 - h)
+        elif distribution == "gaussian":
+            self.stddev = stddev * self.size
+        elif distribution == "hotspot":
+            self.hot_keys = max(1, min(self.size, math.ceil(self.size * hot_fraction)))
+            self.hot_probability = hot_probability
+        self.keys = self._keys()
+
+    def __call__(self) -> int:
+        try:
+            return next(self.keys)
+        except StopIteration:
+            raise KeyGeneratorException(f"All {self.size} keys of sequence are used")
+
+    def _keys(self):
+        while True:
+            keys = self.draw(self.batch)
+            if not len(keys):  # sequence is over
+                return
+            yield from keys.tolist()
+
+    def draw(self, size: int) -> np.ndarray:
+        """size keys at once, fewer (none) when sequence is running out of keys"""
+        if self.step == 1:
+            return self.low + self._draw(size)
+        return self.low + self._draw(size) * self.step
+
+    # Offsets in [0, self.size) of every distribution
+
+    def _uniform(self, size):
+        return self.rng.integers(0, self.size, size)
+
+    def _zipfian(self, size):
+        # Gray et al., "Quickly generating billion-record synthetic databases", as in YCSB and sysbench
+        u = self.rng.random(size)
+        uz = u * self.zetan
+        if self.eta is None:
+            return np.minimum((uz >= 1).astype(np.int64), self.size - 1)
+        base = np.maximum(self.eta * u - self.eta + 1, 0)  # < 0 only where uz < 1 + 0.5 ** theta
+        ranks = (self.size * base ** (1 / (1 - self.theta))).astype(np.int64)
+        ranks = np.where(uz < 1 + 0.5 ** self.theta, 1, ranks)
+        ranks = np.where(uz < 1, 0, ranks)
+        return np.minimum(ranks, self.size - 1)
+
+    def _pareto(self, size):
+        offsets = (self.size * self.rng.random(size) ** self.power).astype(np.int64)
+        return np.minimum(offsets, self.size - 1)
+
+    def _gaussian(self, size):
+        offsets = self.rng.normal((self.size - 1) / 2, self.stddev, size)
+        return np.clip(np.rint(offsets), 0, self.size - 1).astype(np.int64)
+
+    def _sequence(self, size):
+        start = self.position
+        self.position = min(start + size, self.size)
+        return np.arange(start, self.position, dtype=np.int64)
+
+    def _hotspot(self, size):
+        hot = self.rng.random(size) < self.hot_probability
+        cold_keys = self.size - self.hot_keys
+        if not cold_keys:
+            return self.rng.integers(0, self.hot_keys, size)
+        return np.where(
+            hot,
+            self.rng.integers(0, self.hot_keys, size),
+            self.hot_keys + self.rng.integers(0, cold_keys, size),
+        )
+
+
+_generators = {}
+_worker_index, _workers = 0, 1
+
+
+def set_worker(index: int, workers: int):
+    """Index of this worker process (0 based) and the number of workers, for partitions"""
+    global _worker_index, _workers
+    if not 0 <= index < workers:
+        raise KeyGeneratorException(f"Worker index {index} is out of {workers} workers")
+    _worker_index, _workers = index, workers
+
+
+def key_generator(name, config: dict = None, user_index: int = None) -> KeyGenerator:
+    """KeyGenerator name of this process, created from config (keys.<name> of params.yaml) on first use
+
+    With partition: user every user gets its own generator, pass its index in the worker
+    (CustomLocust.user_index)
+    """
+    config = dict(config or {})
+    partition = config.pop("partition", None)
+    users_per_worker = config.pop("users_per_worker", None)
+    if partition is not None and partition not in PARTITIONS:
+        raise KeyGeneratorException(
+            f"Unknown partition {partition} of keys {name}, use one of {', '.join(PARTITIONS)}"
+        )
+    if partition == "user":
+        if user_index is None or not users_per_worker:
+            raise KeyGeneratorException(
+                f"Keys {name} partitioned by user need users_per_worker and user_index"
+            )
+        if user_index >= users_per_worker:
+            raise KeyGeneratorException(
+                f"User {user_index} is out of users_per_worker {users_per_worker} of keys {name}"
+            )
+        config["part"] = _worker_index * users_per_worker + user_index
+        config["parts"] = _workers * users_per_worker
+        config["worker"] = _worker_index
+        return _new_generator(name, config)
+    generator = _generators.get(name)
+    if generator is None:
+        if partition == "worker":
+            config["part"], config["parts"] = _worker_index, _workers
+        config["worker"] = _worker_index  # workers do not draw the same seeded keys
+        generator = _generators[name] = _new_generator(name, config)
+    return generator
+
+
+def _new_generator(name, config):
+    try:
+        return KeyGenerator(**config)
+    except TypeError as e:  # unknown option
+        raise KeyGeneratorException(f"Wrong configuration of keys {name}: {e}")
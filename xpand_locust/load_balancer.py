@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Host load balancer for multi-node Xpand clusters, shared by all connections of a worker process.
+# MySqlClient asks it for a node on every (re)connect.
+#
+# db_config in params.yaml:
+#   host: xpand1,xpand2,xpand3
+#   load_balancer: least_connections # random (default), round_robin, least_connections, latency_ewma
+#   eject_after: 3 # lost connection/connect errors in a row before node is ejected
+#   probe_interval: 10 # seconds between TCP probes of ejected nodes
+
+import logging
+import random
+import socket
+from itertools import count
+
+import gevent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 3306
+EWMA_ALPHA = 0.2
+
+
+class LoadBalancerException(Exception):
+    """Unknown load balancing strategy"""
+
+
+class Node:
+    __slots__ = ("host", "connections", "failures", "down", "latency")
+
+    def __init__(self, host):
+        self.host = host
+        self.connections = 0  # open connections from this process
+        self.failures = 0  # errors in a row
+        self.down = False
+        self.latency = 0.0  # EWMA of statement latency, ms
+
+
+class LoadBalancer:
+    """Random choice between nodes that are up, base class for other strategies"""
+
+    tracks_latency = False
+
+    def __init__(
+        self, hosts: list, port: int = DEFAULT_PORT, eject_after=3, probe_interval=10
+    ):
+        self.nodes = {host: Node(host) for host in hosts}
+        self.port = port
+        self.eject_after = eject_after
+        self.probe_interval = probe_interval
+        self.prober = None
+
+    def pick(self) -> str:
+        nodes = [node for node in self.nodes.values() if not node.down]
+        if not nodes:  # everything is down, keep trying all of them
+            nodes = list(self.nodes.values())
+        return self.choose(nodes).host
+
+    def choose(self, nodes):
+        return random.choice(nodes)
+
+    def connected(self, host):
+        node = self.nodes[host]
+        node.connections += 1
+        node.failures = 0
+
+    def disconnected(self, host):
+        node = self.nodes[host]
+        node.connections = max(node.connections - 1, 0)
+
+    def failed(self, host):
+        """Lost connection or could not connect to the node"""
+        node = self.nodes[host]
+        node.failures += 1
+        if not node.down and node.failures >= self.eject_after:
+            node.down = True
+            logger.warning(f"Node {host} is down after {node.failures} errors, ejected")
+            if self.prober is None:
+                self.prober = gevent.spawn(self._probe)
+
+    def observe(self, host, latency_ms):
+        node = self.nodes[host]
+        node.latency += EWMA_ALPHA * (latency_ms - node.latency)
+
+    def _probe(self):
+        """Bring ejected nodes back once they accept TCP connections again"""
+        while any(node.down for node in self.nodes.values()):
+            gevent.sleep(self.probe_interval)
+            for node in self.nodes.values():
+                if not node.down:
+                    continue
+                try:
+                    socket.create_connection(
+                        (node.host, self.port), timeout=self.probe_interval
+                    ).close()
+                except OSError:
+                    continue
+                node.down, node.failures = False, 0
+                logger.warning(f"Node {node.host} is back")
+        self.prober = None
+
+
+class RoundRobinBalancer(LoadBalancer):
+    def __init__(self, *args, **kwargs):
+        super(RoundRobinBalancer, self).__init__(*args, **kwargs)
+        self.counter = count()
+
+    def choose(self, nodes):
+        return nodes[next(self.counter) % len(nodes)]
+
+
+class LeastConnectionsBalancer(LoadBalancer):
+    def choose(self, nodes):
+        least = min(node.connections for node in nodes)
+        return random.choice([node for node in nodes if node.connections == least])
+
+
+class LatencyEwmaBalancer(LoadBalancer):
+    """Lowest statement latency EWMA weighted by open connections, unmeasured nodes first"""
+
+    tracks_latency = True
+
+    def choose(self, nodes):
+        return min(
+            nodes,
+            key=lambda node: (node.latency * (node.connections + 1), node.connections),
+        )
+
+
+strategies = {
+    "random": LoadBalancer,
+    "round_robin": RoundRobinBalancer,
+    "least_connections": LeastConnectionsBalancer,
+    "latency_ewma": LatencyEwmaBalancer,
+}
+
+_balancers = {}
+
+
+def get_balancer(hosts: str, strategy: str = "random", **kwargs) -> LoadBalancer:
+    """The balancer of this worker process for given host list"""
+    key = (hosts, strategy)
+    if key not in _balancers:
+        try:
+            balancer_class = strategies[strategy]
+        except KeyError:
+            raise LoadBalancerException(
+                f"Unknown load balancer {strategy}, supported are: {', '.join(strategies)}"
+            )
+        _balancers[key] = balancer_class(hosts.split(","), **kwargs)
+    return _balancers[key]
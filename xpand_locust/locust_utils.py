@@ -1,3 +1,4 @@
+import math
 import os
 import sys
 
@@ -25,11 +26,153 @@ def load_yaml_config(yaml_config_file):
         raise YamlConfigException(f"Config file {yaml_config_file} does not exist")
 
 
+SEED_DIR_SUFFIX = ".seed"  # directory of a converted seed file
+SEED_COLUMNS_FILE = "columns"  # column names in file order, one per line
+
+
+class SeedCursor:
+    """Endless iterator over rows of SeedData in random order, shares the values
+
+    Walks the rows with a random start and a random stride coprime with their number,
+    so every row is returned once per len(rows) calls. Rows of one column are returned
+    as Python values, rows of several columns as tuples of them, same as seed_stream
+    """
+
+    __slots__ = ("columns", "size", "position", "stride")
+
+    def __init__(self, columns, rng):
+        n = len(columns[0])
+        self.columns = columns
+        self.size = n
+        self.position = int(rng.integers(n))
+        self.stride = 1
+        if n > 2:
+            stride = int(rng.integers(1, n))
+            while math.gcd(stride, n) != 1:
+                stride = stride % (n - 1) + 1
+            self.stride = stride
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        position = self.position
+        self.position = (position + self.stride) % self.size
+        if len(self.columns) == 1:
+            return self.columns[0][position].item()
+        return tuple(column[position].item() for column in self.columns)
+
+
+def seed_stream(columns, batch, rng):
+    """Endless random draws (with replacement) of rows of columns
+
+    Draws batch rows at once with one vectorized call and hands them out one by one,
+    the next batch is drawn when this one is used up: memory is bounded by batch
+    """
+    n = len(columns[0])
+    while True:
+        rows = rng.integers(0, n, batch)
+        if len(columns) == 1:
+            yield from columns[0][rows].tolist()
+        else:
+            yield from zip(*[column[rows].tolist() for column in columns])
+
+
+def convert_seed_file(seed_file, columns: dict, target=None) -> str:
+    """Convert a headerless CSV seed file into a directory of memory-mappable columns
+
+    columns: name -> dtype, in CSV order. dtype is a NumPy type (int32, int64, float64, ...),
+    str or bytes (fixed width, as wide as the longest value, bytes are UTF-8 encoded).
+    Every column is saved as <target>/<name>.npy, target defaults to the seed file name
+    with .seed suffix
+    """
+    target = target or os.path.splitext(seed_file)[0] + SEED_DIR_SUFFIX
+    df = pd.read_csv(
+        seed_file,
+        header=None,
+        names=list(columns),
+        dtype={
+            name: str if dtype in ("str", "bytes") else dtype
+            for name, dtype in columns.items()
+        },
+        keep_default_na=False,
+    )
+    os.makedirs(target, exist_ok=True)
+    for name, dtype in columns.items():
+        values = df[name].to_numpy()  # strings are python objects, also with pandas string dtype
+        if dtype == "bytes":
+            values = np.char.encode(values.astype(str), "utf-8")
+        else:
+            values = values.astype(dtype)
+        np.save(os.path.join(target, f"{name}.npy"), values)
+    with open(os.path.join(target, SEED_COLUMNS_FILE), "wt") as f:
+        f.write("\n".join(columns) + "\n")
+    return target
+
+
+class SeedData:
+    """Rows of a seed file, loaded once per process
+
+    seed_file is either a headerless CSV file (column 0 is read) or a directory written
+    by convert_seed_file. Columns of the latter are memory-mapped: worker processes
+    of a driver share their pages through the OS page cache and nothing is parsed at startup
+    """
+
+    def __init__(self, seed_file):
+        if os.path.isdir(seed_file):
+            with open(os.path.join(seed_file, SEED_COLUMNS_FILE), "rt") as f:
+                names = f.read().split()
+            self.columns = {
+                name: np.load(os.path.join(seed_file, f"{name}.npy"), mmap_mode="r")
+                for name in names
+            }
+        else:
+            values = pd.read_csv(seed_file, header=None)[0].to_numpy()
+            if values.dtype == object:  # strings, fixed width array instead of python objects
+                values = values.astype(str)
+            self.columns = {0: values}
+        self.values = next(iter(self.columns.values()))  # first column
+        if not len(self.values):
+            raise ValueError(f"Seed file {seed_file} is empty")
+
+    def __len__(self):
+        return len(self.values)
+
+    def _columns(self, columns):
+        if columns is None:
+            return tuple(self.columns.values())
+        return tuple(self.columns[name] for name in columns)
+
+    def cursor(self, seed=None, columns=None) -> SeedCursor:
+        """Independent random iterator for one user, costs no copy of the values
+
+        columns: names of the columns to return, all by default
+        """
+        return SeedCursor(self._columns(columns), np.random.default_rng(seed))
+
+    def stream(self, batch=10000, seed=None, columns=None):
+        """Independent endless iterator of random draws for one user, see seed_stream"""
+        return seed_stream(self._columns(columns), batch, np.random.default_rng(seed))
+
+
+_seed_data = {}
+
+
+def seed_data(seed_file) -> SeedData:
+    """SeedData of seed_file, read on first use and shared by all users of the process"""
+    data = _seed_data.get(seed_file)
+    if data is None:
+        data = _seed_data[seed_file] = SeedData(seed_file)
+    return data
+
+
 def load_seed_file(seed_file, num_rows_required=10000):
-    df = pd.read_csv(seed_file, header=None)
-    values = df[0].values.tolist()
-    arr = np.random.choice(values, num_rows_required)
-    return iter(arr)
+    """Endless iterator of random values of seed_file (column 0)
+
+    Values are drawn num_rows_required at a time, the iterator never runs out
+    """
+    data = seed_data(seed_file)
+    return data.stream(batch=num_rows_required, columns=list(data.columns)[:1])
 
 
 def is_worker():
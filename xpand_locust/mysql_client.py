@@ -1,120 +1,648 @@
-import random
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter_ns
 from typing import Tuple
 
+import gevent
 import gevent.monkey  # https://github.com/PyMySQL/PyMySQL/issues/451
-import pymysql
-import pymysql.cursors  # https://github.com/PyMySQL/PyMySQL
-from retry import retry
+import numpy as np
 
-from .custom_timer import custom_timer
+from .connect_ramp import connect_gate
+from .custom_timer import (
+    NS_PER_MS,
+    child_span,
+    current_transaction_name,
+    custom_timer,
+    io_counters,
+    log_child_span,
+    log_metric,
+    report_request,
+)
+from .drivers import DriverException, get_driver
+from .load_balancer import DEFAULT_PORT, get_balancer
+from .retry_policy import RetryPolicy
+from .sql_digest import DIGEST_REQUEST_TYPE, sql_digest
 
 gevent.monkey.patch_all()
 
-lost_connection_codes = ["1927", "2006", "2013", "1927"]
-retry_transaction_codes = ["16388"]
+lost_connection_codes = [1927, 2006, 2013]
+retry_transaction_codes = [16388]
+# Inside a transaction these mean the server has rolled it back: replay the whole transaction
+replay_transaction_codes = retry_transaction_codes + [1213]  # 1213 - deadlock
+
+QUERY, QUERY_ALL, EXECUTE, EXECUTEMANY, COMMIT, QUERY_COUNT = range(6)
+REPLAY_REQUEST_TYPE = "REPLAY"
+CONNECT_REQUEST_TYPE = "CONNECT"
+PIPELINE_REQUEST_TYPE = "PIPELINE"
+KEEPALIVE_REQUEST_TYPE = "KEEPALIVE"
+
+DEFAULT_PREPARED_CACHE_SIZE = 256
+RESULT_FORMATS = ("dict", "tuple", "count", "numpy")
+CONNECT_RETRY = {"tries": 30, "base_delay": 0.1, "max_delay": 1}
+
 
 class MySqlClientRetryException(Exception):
-    """Group Change exception"""
+    """Group Change exception, args[0] is the errno"""
+
+
+def with_retries(func):
+    """Retry MySqlClientRetryException with client's backoff policy, no overhead when first attempt succeeds"""
+    name = func.__name__.lstrip("_")
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        start_time = perf_counter_ns()
+        try:
+            return func(self, *args, **kwargs)
+        except MySqlClientRetryException as e:
+            return self.retry_policy.resume(
+                name,
+                e,
+                start_time,
+                MySqlClientRetryException,
+                self.driver.errno,
+                func,
+                self,
+                *args,
+                **kwargs,
+            )
+
+    return wrapper
+
+
+class PreparedStatementCache:
+    """Bounded LRU of prepared statement cursors of one connection, keyed by SQL text"""
+
+    def __init__(self, driver, conn, size=DEFAULT_PREPARED_CACHE_SIZE, dict_rows=True):
+        self.driver = driver
+        self.conn = conn
+        self.size = size
+        self.dict_rows = dict_rows
+        self.cursors = OrderedDict()
+
+    def cursor(self, query):
+        cur = self.cursors.get(query)
+        if cur is None:
+            cur = self.cursors[query] = self.driver.prepared_cursor(
+                self.conn, self.dict_rows
+            )
+            if len(self.cursors) > self.size:
+                _, evicted = self.cursors.popitem(last=False)
+                evicted.close()  # deallocates server side statement
+        else:
+            self.cursors.move_to_end(query)
+        return cur
+
+    def clear(self):
+        """Connection is gone, so are its statements"""
+        self.cursors.clear()
+
+
+def check_result_format(result_format):
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(
+            f"Unknown result_format {result_format}, supported are: {', '.join(RESULT_FORMATS)}"
+        )
+
+
+def to_record_array(rows, description):
+    """numpy record array with one field per column"""
+    names = [column[0] for column in description]
+    if not rows:
+        return np.rec.fromarrays([[]] * len(names), names=names)
+    return np.rec.fromrecords(rows, names=names)
+
+
+class Pipeline:
+    """Statements sent to the server in one round trip, results are read back in order
+
+        pipe = self.client.pipeline()
+        for _ in range(9):
+            pipe.query("SELECT c FROM sbtest1 WHERE id=%s", (get_random_id(),))
+        pipe.execute("UPDATE sbtest1 SET k=k+1 WHERE id=%s", (get_random_id(),))
+        pipe.commit()
+        results = pipe.send()  # one result per statement
+
+    Statements are named after the calling function (or name=) and reported as child spans
+    of the active custom_timer(spans=True) transaction, or as PIPELINE <name> outside of one.
+    Outside of a transaction a batch is retried after group change only when its first statement
+    has failed and it has no COMMIT: otherwise statements before the failed one may be committed
+    """
+
+    def __init__(self, client, result_format=None):
+        self.client = client
+        self.result_format = result_format
+        self.statements = []
+
+    def query(self, query, params=None, name=None):
+        self.statements.append(
+            (QUERY, query, params, name or sys._getframe(1).f_code.co_name)
+        )
+        return self
+
+    def query_all(self, query, params=None, name=None):
+        self.statements.append(
+            (QUERY_ALL, query, params, name or sys._getframe(1).f_code.co_name)
+        )
+        return self
+
+    def execute(self, query, params=None, name=None):
+        self.statements.append(
+            (EXECUTE, query, params, name or sys._getframe(1).f_code.co_name)
+        )
+        return self
+
+    def commit(self, name="commit"):
+        self.statements.append((COMMIT, None, None, name))
+        return self
+
+    def send(self) -> list:
+        statements, self.statements = self.statements, []
+        return self.client._pipeline(statements, self.result_format)
+
 
 class MySqlClient:
-    def __init__(self, **kwargs):
+    def __init__(self, lazy_connect=False, **kwargs):
+        """With lazy_connect=True the connection is opened by the first connect() call or statement"""
         self.connect_params = kwargs.copy()
-        hosts = kwargs.get("host").split(",")
-        rnd = random.randint(0, len(hosts) - 1)
-        self.connect_params["host"] = hosts[
-            rnd
-        ]  # ToDo: random.choice or https://pypi.org/project/roundrobin/
-        self.connect_params["cursorclass"] = pymysql.cursors.DictCursor
-        self.conn, self.cur = self.connect()
-
-    @retry((pymysql.Error), tries=30, delay=1)
+        self.driver = get_driver(self.connect_params.pop("driver", "pymysql"))
+        self.prepared = self.connect_params.pop("prepared", False)
+        self.prepared_cache_size = self.connect_params.pop(
+            "prepared_cache_size", DEFAULT_PREPARED_CACHE_SIZE
+        )
+        if self.prepared and not self.driver.supports_prepared:
+            raise DriverException(
+                f"Prepared statements are not supported by {self.driver.module_name}, use driver: mariadb"
+            )
+        self.statements, self.tuple_statements = None, None
+        self.result_format = self.connect_params.pop("result_format", "dict")
+        check_result_format(self.result_format)
+        self.retry_policy = RetryPolicy(**self.connect_params.pop("retry", {}))
+        self.connect_retry_policy = RetryPolicy(
+            **dict(CONNECT_RETRY, **self.connect_params.pop("connect_retry", {}))
+        )
+        self.balancer = get_balancer(
+            self.connect_params.pop("host"),
+            self.connect_params.pop("load_balancer", "random"),
+            port=self.connect_params.get("port", DEFAULT_PORT),
+            eject_after=self.connect_params.pop("eject_after", 3),
+            probe_interval=self.connect_params.pop("probe_interval", 10),
+        )
+        self.track_latency = self.balancer.tracks_latency
+        self.digests = self.connect_params.pop("digests", False)
+        self.keepalive = self.connect_params.pop("keepalive", 0)
+        self.host = None
+        self.trx_log, self.trx_name = None, None
+        self.conn, self.cur, self.tuple_cur = None, None, None
+        self.connect_attempts = 0
+        if not lazy_connect:
+            self.conn, self.cur = self.connect()
+
     def connect(self) -> Tuple:
+        return self.connect_retry_policy.call(
+            "connect", self.driver.Error, self.driver.errno, self._connect
+        )
 
-        self.conn = pymysql.connect(**self.connect_params)
-        self.cur = self.conn.cursor()
+    def _connect(self) -> Tuple:
+        self.close()
+        if self.statements is not None:
+            self.statements.clear()
+            self.tuple_statements.clear()
+        # Every (re)connect may go to another node
+        self.connect_params["host"] = host = self.balancer.pick()
+        self.connect_attempts += 1
+        with connect_gate():
+            start_time = perf_counter_ns()
+            try:
+                self.conn = self.driver.connect(**self.connect_params)
+            except self.driver.Error as e:
+                log_metric(
+                    CONNECT_REQUEST_TYPE, host, perf_counter_ns() - start_time, exception=e
+                )
+                self.balancer.failed(host)
+                raise
+            log_metric(CONNECT_REQUEST_TYPE, host, perf_counter_ns() - start_time)
+        for phase, duration in self.driver.connect_phases(self.conn).items():
+            log_metric(CONNECT_REQUEST_TYPE, f"{host}/{phase}", duration)
+        self.host = host
+        self.balancer.connected(host)
+        self.driver.count_bytes(self.conn, io_counters)
+        self.cur = self.driver.cursor(self.conn)
+        self.tuple_cur = self.driver.cursor(self.conn, dict_rows=False)
+        if self.prepared:
+            self.statements = PreparedStatementCache(
+                self.driver, self.conn, self.prepared_cache_size
+            )
+            self.tuple_statements = PreparedStatementCache(
+                self.driver, self.conn, self.prepared_cache_size, dict_rows=False
+            )
         return (self.conn, self.cur)
 
+    def close(self):
+        if self.host is not None:
+            self.balancer.disconnected(self.host)
+            self.host = None
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:  # connection is already broken
+                pass
+            self.conn, self.cur, self.tuple_cur = None, None, None
+
+    def ping(self):
+        """Check the connection between tasks, reconnect if it is gone
+
+        Reported as KEEPALIVE <host>, failed pings are its failures. Returns False if
+        the connection could not be restored, the next statement will try again
+        """
+        if self.conn is None or self.trx_log is not None:
+            return True
+        host = self.host
+        start_time = perf_counter_ns()
+        try:
+            self.driver.ping(self.conn)
+        except self.driver.Error as e:
+            log_metric(KEEPALIVE_REQUEST_TYPE, host, perf_counter_ns() - start_time, exception=e)
+            if host is not None:
+                self.balancer.failed(host)
+            try:
+                self.connect()
+            except self.driver.Error:
+                return False
+            return True
+        log_metric(KEEPALIVE_REQUEST_TYPE, host, perf_counter_ns() - start_time)
+        return True
+
+    def idle(self, seconds):
+        """Sleep between tasks, ping the connection every keepalive seconds of it"""
+        keepalive = self.keepalive
+        while keepalive and seconds > keepalive:
+            gevent.sleep(keepalive)
+            seconds -= keepalive
+            self.ping()
+        gevent.sleep(seconds)
+
+    def _cursor(self, query, dict_rows=True):
+        """Prepared statement cursor for query in prepared mode, shared text protocol cursor otherwise"""
+        if self.statements is None:
+            return self.cur if dict_rows else self.tuple_cur
+        if dict_rows:
+            return self.statements.cursor(query)
+        return self.tuple_statements.cursor(query)
+
+    def _observe(self, start_time):
+        self.balancer.observe(self.host, (perf_counter_ns() - start_time) / NS_PER_MS)
+
     def handle_exception(self, e):
         do_reconnect = False
+        errno = self.driver.errno(e)
 
-        for (
-            code
-        ) in (
-            retry_transaction_codes
-        ):
-            if code in str(e):
-                raise MySqlClientRetryException
+        if errno in retry_transaction_codes:
+            raise MySqlClientRetryException(errno)
 
-
-        if isinstance(e, pymysql.InterfaceError):  # connection closed from driver side
+        if isinstance(e, self.driver.InterfaceError):  # connection closed from driver side
             do_reconnect = True
 
         # This is a database problem and I've lost connection
-        for (
-            code
-        ) in (
-            lost_connection_codes
-        ):
-            if code in str(e):
-                do_reconnect = True
+        if errno in lost_connection_codes:
+            do_reconnect = True
+            if self.host is not None:
+                self.balancer.failed(self.host)
 
         if do_reconnect:
             self.conn, self.cur = self.connect()
 
         raise e  # Now I am ready to repeat the transaction again
 
-    @retry(MySqlClientRetryException, tries=10, delay=1)
-    def _query(self, query, params=None):
+    def _run(self, kind, query, params, result_format=None):
+        """Run one statement, record it when inside a transaction"""
+        if kind == COMMIT:
+            self.conn.commit()
+            return None
+        result_format = result_format or self.result_format
+        if kind == QUERY_ALL and result_format == "count":
+            kind = QUERY_COUNT
+        if kind == QUERY_COUNT:
+            cur = self.driver.unbuffered_cursor(self.conn, dict_rows=False)
+        else:
+            cur = self._cursor(query, result_format == "dict")
+        start_time = perf_counter_ns()
+        try:
+            if kind == EXECUTEMANY:
+                cur.executemany(query, params)
+            else:
+                cur.execute(query, params)
+            if kind == QUERY:
+                result = cur.fetchone()
+                if result is not None:
+                    io_counters.rows += 1
+            elif kind == QUERY_ALL:
+                result = cur.fetchall()
+                io_counters.rows += len(result)
+                if result_format == "numpy":
+                    result = to_record_array(result, cur.description)
+            elif kind == QUERY_COUNT:
+                result = 0
+                try:
+                    for _ in cur:  # rows are read and dropped one by one
+                        result += 1
+                finally:  # an unbuffered cursor left open blocks the connection
+                    cur.close()
+                io_counters.rows += result
+            else:
+                result = cur.rowcount  # Return how many values has been updated
+                if result > 0:
+                    io_counters.rows_affected += result
+        except self.driver.Error as e:
+            if self.digests:
+                log_metric(
+                    DIGEST_REQUEST_TYPE,
+                    sql_digest(query),
+                    perf_counter_ns() - start_time,
+                    exception=e,
+                )
+            raise
+        if self.track_latency:
+            self._observe(start_time)
+        if self.digests:
+            log_metric(DIGEST_REQUEST_TYPE, sql_digest(query), perf_counter_ns() - start_time)
+        if self.trx_log is not None:
+            self.trx_log.append((kind, query, params, result_format))
+        return result
+
+    def _statement(self, kind, query, params, result_format=None):
+        if self.conn is None:  # lazy_connect
+            self.connect()
         try:
-            self.cur.execute(query, params)
-            row = self.cur.fetchone()
-            return row
-        except (pymysql.Error) as e:
+            return self._run(kind, query, params, result_format)
+        except self.driver.Error as e:
+            if self.trx_log is not None and self._is_replayable(e):
+                if not self._commit_lost(kind, e):
+                    return self._replay_transaction(
+                        e, kind, query, params, result_format
+                    )
+                self.trx_log = None
             self.handle_exception(e)
 
-    @retry(MySqlClientRetryException, tries=10, delay=1)
-    def _query_all(self, query, params=None):
+    def _is_lost_connection(self, e):
+        return self.driver.errno(e) in lost_connection_codes or isinstance(
+            e, self.driver.InterfaceError
+        )
+
+    def _is_replayable(self, e):
+        """Transaction has been rolled back by the server or the connection is gone"""
+        return self.driver.errno(e) in replay_transaction_codes or self._is_lost_connection(e)
+
+    def _commit_lost(self, kind, e):
+        """Connection is gone during COMMIT: it may have been applied, a replay could apply
+        the transaction twice"""
+        return kind == COMMIT and self._is_lost_connection(e)
+
+    def _replay_transaction(self, error, kind, query, params, result_format=None):
+        """Roll back, run all statements of the transaction again and continue with the failed one"""
+        statements = self.trx_log
+        name = f"{self.trx_name}/{self.driver.errno(error)}"
+        start_time = perf_counter_ns()
+        for attempt in range(self.retry_policy.tries):
+            if self._is_lost_connection(error):
+                if self.host is not None:
+                    self.balancer.failed(self.host)
+                self.connect()
+            gevent.sleep(self.retry_policy.delay(attempt))
+            failed_kind = None  # kind of the failed statement, None - one of the replayed ones
+            try:
+                self.conn.rollback()
+                self.trx_log = []
+                self.driver.begin(self.conn)
+                for statement in statements:
+                    self._run(*statement)
+                failed_kind = kind
+                result = self._run(kind, query, params, result_format)
+            except self.driver.Error as e:
+                if not self._is_replayable(e) or self._commit_lost(failed_kind, e):
+                    self.trx_log = None
+                    self.handle_exception(e)
+                error = e
+                continue
+            log_metric(REPLAY_REQUEST_TYPE, name, perf_counter_ns() - start_time)
+            return result
+        self.trx_log = None
+        raise error
+
+    @child_span
+    @with_retries
+    def _query(self, query, params=None, result_format=None):
+        return self._statement(QUERY, query, params, result_format)
+
+    @child_span
+    @with_retries
+    def _query_all(self, query, params=None, result_format=None):
+        """result_format: dict, tuple, count (number of rows only) or numpy (record array)"""
+        return self._statement(QUERY_ALL, query, params, result_format)
+
+    @child_span
+    @with_retries
+    def _query_count(self, query, params=None):
+        """Stream the result set from the server and return number of rows only"""
+        return self._statement(QUERY_COUNT, query, params)
+
+    def _query_iter(self, query, params=None, result_format=None):
+        """Lazy iterator over rows of an unbuffered cursor
+
+        Rows are read from the server while you iterate: drain or close the iterator before
+        the next statement on this connection. Not retried and not recorded for transaction replay
+        """
+        if self.conn is None:
+            self.connect()
+        cur = self.driver.unbuffered_cursor(
+            self.conn, (result_format or self.result_format) == "dict"
+        )
         try:
-            self.cur.execute(query, params)
-            rows = self.cur.fetchall()
-            return rows
-        except (pymysql.Error) as e:
+            cur.execute(query, params)
+            for row in cur:
+                io_counters.rows += 1
+                yield row
+        except self.driver.Error as e:
             self.handle_exception(e)
+        finally:
+            cur.close()
 
-    def trx_begin(self):
-        self.conn.begin()
+    def pipeline(self, result_format=None) -> Pipeline:
+        """Batch of statements sent in one round trip, see Pipeline"""
+        if not self.driver.supports_pipeline:
+            raise DriverException(
+                f"Pipelining is not supported by {self.driver.module_name}, use driver: pymysql or mysqlclient"
+            )
+        return Pipeline(self, result_format)
 
+    def _run_pipeline(self, statements, result_format, results):
+        """Send statements as one multi-statement query and read their results in order
+
+        A result is appended to results as soon as it arrives, on error the number of results
+        is the index of the failed statement. Statement time is the time since the previous result
+        """
+        cur = self.cur if result_format == "dict" else self.tuple_cur
+        sql = ";\n".join(
+            "COMMIT" if kind == COMMIT else self.driver.mogrify(cur, query, params)
+            for kind, query, params, _ in statements
+        )
+        start_time = previous = perf_counter_ns()
+        try:
+            cur.execute(sql)
+            for kind, query, params, name in statements:
+                if results:
+                    cur.nextset()
+                if kind == QUERY:
+                    result = cur.fetchone()
+                    if result is not None:
+                        io_counters.rows += 1
+                elif kind == QUERY_ALL:
+                    result = cur.fetchall()
+                    io_counters.rows += len(result)
+                    if result_format == "count":
+                        result = len(result)
+                    elif result_format == "numpy":
+                        result = to_record_array(result, cur.description)
+                elif kind == EXECUTE:
+                    result = cur.rowcount
+                    if result > 0:
+                        io_counters.rows_affected += result
+                else:
+                    result = None
+                now = perf_counter_ns()
+                self._log_pipelined(kind, name, previous, now - previous, result)
+                if self.digests and kind != COMMIT:
+                    log_metric(DIGEST_REQUEST_TYPE, sql_digest(query), now - previous)
+                previous = now
+                results.append(result)
+                if kind == COMMIT:
+                    self.trx_log = None
+                elif self.trx_log is not None:
+                    self.trx_log.append((kind, query, params, result_format))
+        except self.driver.Error as e:
+            kind, query, _, name = statements[len(results)]
+            self._log_pipelined(kind, name, previous, perf_counter_ns() - previous, exception=e)
+            if self.digests and kind != COMMIT:
+                log_metric(
+                    DIGEST_REQUEST_TYPE,
+                    sql_digest(query),
+                    perf_counter_ns() - previous,
+                    exception=e,
+                )
+            raise
+        if self.track_latency:
+            self._observe(start_time)
+
+    def _log_pipelined(self, kind, name, start_time, duration, result=None, exception=None):
+        """Child span of the active transaction, PIPELINE <name> request outside of one"""
+        if current_transaction_name() is not None:
+            log_child_span(name, duration, exception)
+            return
+        if kind == QUERY:
+            result = 0 if result is None else 1  # rows returned
+        report_request(PIPELINE_REQUEST_TYPE, name, start_time, duration, result, exception)
+
+    @with_retries
+    def _pipeline(self, statements, result_format=None):
+        result_format = result_format or self.result_format
+        results = []
+        if self.conn is None:
+            self.connect()
+        try:
+            self._run_pipeline(statements, result_format, results)
+        except self.driver.Error as e:
+            if self._commit_lost(statements[len(results)][0], e):
+                self.trx_log = None
+            if self.trx_log is None or not self._is_replayable(e):
+                if self.driver.errno(e) in retry_transaction_codes and (
+                    results or any(statement[0] == COMMIT for statement in statements)
+                ):
+                    # a retry would send statements that ran (with autocommit) or may have
+                    # been committed again
+                    raise
+                self.handle_exception(e)
+            # Replay the transaction with the failed statement, then run the rest one by one
+            failed = len(results)
+            for kind, query, params, _ in statements[failed:]:
+                try:
+                    if len(results) == failed:
+                        result = self._replay_transaction(
+                            e, kind, query, params, result_format
+                        )
+                    else:
+                        result = self._statement(kind, query, params, result_format)
+                finally:
+                    if kind == COMMIT:
+                        self.trx_log = None
+                results.append(result)
+        return results
+
+    @child_span(name="begin")
+    def trx_begin(self, name=None):
+        """Begin transaction. Its statements are recorded and replayed after group change,
+        deadlock or lost connection. Replays are reported as REPLAY <name>/<errno>"""
+        if self.conn is None:
+            self.connect()
+        self.driver.begin(self.conn)
+        self.trx_log = []
+        self.trx_name = name or current_transaction_name() or "transaction"
+
+    @child_span(name="commit")
     def trx_commit(self):
-        self.conn.commit()
+        try:
+            self._statement(COMMIT, None, None)
+        finally:
+            self.trx_log = None
 
-    @retry(MySqlClientRetryException, tries=10, delay=1)
-    def _execute(self, query, params):
+    @child_span(name="rollback")
+    def trx_rollback(self):
+        self.trx_log = None
+        if self.conn is None:
+            return
         try:
-            self.cur.execute(query, params)
-            return self.cur.rowcount  # Return how many values has been updated
-        except (pymysql.Error) as e:
+            self.conn.rollback()
+        except self.driver.Error as e:
             self.handle_exception(e)
 
-    @retry(MySqlClientRetryException, tries=10, delay=1)
-    def _executemany(self, query, params):
+    @contextmanager
+    def transaction(self, name=None):
+        """with self.client.transaction(): - commit on success, rollback on exception"""
+        self.trx_begin(name)
         try:
-            self.cur.executemany(query, params)
-            return self.cur.rowcount  # Return how many values has been updated
-        except (pymysql.Error) as e:
-            self.handle_exception(e)
+            yield self
+        except BaseException:
+            self.trx_rollback()
+            raise
+        self.trx_commit()
+
+    @child_span
+    @with_retries
+    def _execute(self, query, params):
+        return self._statement(EXECUTE, query, params)
+
+    @child_span
+    @with_retries
+    def _executemany(self, query, params):
+        return self._statement(EXECUTEMANY, query, params)
 
-    @custom_timer
+    @custom_timer(from_caller=True)
     def execute(self, query, params):
         return self._execute(query, params)
 
-    @custom_timer
+    @custom_timer(from_caller=True)
     def executemany(self, query, params):
         return self._executemany(query, params)
 
-    @custom_timer
-    def query_all(self, query, params=None):
-        return self._query_all(query, params)
+    @custom_timer(from_caller=True)
+    def query_all(self, query, params=None, result_format=None):
+        return self._query_all(query, params, result_format)
+
+    @custom_timer(from_caller=True)
+    def query(self, query, params=None, result_format=None):
+        return self._query(query, params, result_format)
 
-    @custom_timer
-    def query(self, query, params=None):
-        return self._query(query, params)
+    @custom_timer(from_caller=True)
+    def query_count(self, query, params=None):
+        return self._query_count(query, params)
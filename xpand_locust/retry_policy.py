@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Exponential backoff with jitter for MySqlClient retries.
+# Every retry is reported as "RETRY <operation>/<errno>": number of requests is the
+# number of retries and response time is latency added by the retry (failed attempt + backoff)
+#
+# db_config in params.yaml:
+#   retry: # 16388 group change and other transient errors
+#     tries: 10
+#     base_delay: 0.01 # seconds, delay before first retry
+#     max_delay: 1 # seconds
+#     multiplier: 2
+#     jitter: 0.5 # up to 50% of delay is randomly taken off
+#   connect_retry:
+#     tries: 30
+#     base_delay: 0.1
+#     max_delay: 1
+
+import random
+from time import perf_counter_ns
+
+import gevent
+
+from .custom_timer import log_metric
+
+RETRY_REQUEST_TYPE = "RETRY"
+
+
+class RetryPolicy:
+    def __init__(
+        self, tries=10, base_delay=0.01, max_delay=1.0, multiplier=2.0, jitter=0.5
+    ):
+        self.tries = tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        """Backoff in seconds after failed attempt number attempt (0 based)"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        return delay * (1 - self.jitter * random.random())
+
+    def call(self, name, exceptions, errno, func, *args, **kwargs):
+        """Call func, retry with backoff while it raises one of exceptions"""
+        start_time = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        except exceptions as e:
+            return self.resume(name, e, start_time, exceptions, errno, func, *args, **kwargs)
+
+    def resume(self, name, error, start_time, exceptions, errno, func, *args, **kwargs):
+        """func has failed with error in attempt started at start_time, retry it with backoff"""
+        for attempt in range(1, self.tries):
+            gevent.sleep(self.delay(attempt - 1))
+            log_metric(
+                RETRY_REQUEST_TYPE, f"{name}/{errno(error)}", perf_counter_ns() - start_time
+            )
+            start_time = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            except exceptions as e:
+                error = e
+        raise error
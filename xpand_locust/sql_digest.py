@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+# Statement digests: SQL text with literals and placeholders replaced by ?, IN lists collapsed
+# and table number suffixes replaced by {n}, so all statements of the same shape share one stats entry:
+#   SELECT c FROM sbtest7 WHERE id IN (%s, %s, %s) -> SELECT c FROM sbtest{n} WHERE id IN (...)
+#
+# db_config in params.yaml:
+#   digests: True # report every statement as DIGEST <digest> next to the task stats
+
+import re
+from functools import lru_cache
+
+DIGEST_REQUEST_TYPE = "DIGEST"
+DIGEST_CACHE_SIZE = 4096  # distinct SQL texts per process
+
+_table_number = re.compile(
+    r"\b(FROM|JOIN|INTO|UPDATE|TABLE)(\s+)([A-Za-z_]\w*?)\d+\b", re.IGNORECASE
+)
+_literal = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'"  # 'string'
+    r'|"(?:[^"\\]|\\.)*"'  # "string"
+    r"|%\(\w+\)s|%s|\?"  # placeholders
+    r"|\b0x[0-9a-fA-F]+\b|\b\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b"  # numbers
+)
+_in_list = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_whitespace = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=DIGEST_CACHE_SIZE)
+def sql_digest(query: str) -> str:
+    """Normalized statement text, cached per SQL text"""
+    digest = _table_number.sub(r"\1\2\3{n}", query)
+    digest = _literal.sub("?", digest)
+    digest = _in_list.sub("IN (...)", digest)
+    return _whitespace.sub(" ", digest).strip()
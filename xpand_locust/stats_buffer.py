@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 dvolkov@mariadb
+
+import logging
+import time
+from array import array
+
+import gevent
+
+from .io_stats import log_io
+
+logger = logging.getLogger(__name__)
+
+
+class StatsBuffer:
+    """Per-worker buffer of request timings
+
+    Instead of firing request_success/request_failure for every request, custom_timer
+    appends (name id, start ns, duration ns, length, rows affected, bytes, ok) to compact arrays. The buffer is
+    folded into RequestStats in bulk every flush_interval_ms and right before every report
+    to master. Only locust's own stats are updated: other request_success listeners are not called
+    """
+
+    def __init__(self, stats, flush_interval_ms=500):
+        self.stats = stats
+        self.flush_interval = flush_interval_ms / 1000
+        # perf_counter_ns() is not a wall clock, remember the offset once
+        self.wall_offset = time.time() - time.perf_counter_ns() / 1e9
+        self.name_ids = {}
+        self.names = []
+        self.name_id = array("I")
+        self.start_ns = array("q")
+        self.duration_ns = array("q")
+        self.length = array("q")
+        self.rows_affected = array("q")
+        self.bytes_received = array("q")
+        self.ok = array("b")
+        self.errors = {}  # record index -> exception, failures only
+        self.flusher = None
+
+    def record(
+        self,
+        request_type,
+        name,
+        start_ns,
+        duration_ns,
+        length,
+        error=None,
+        rows_affected=0,
+        bytes_received=0,
+    ):
+        key = (name, request_type)
+        name_id = self.name_ids.get(key)
+        if name_id is None:
+            name_id = self.name_ids[key] = len(self.names)
+            self.names.append(key)
+        if error is not None:
+            self.errors[len(self.ok)] = error
+        self.name_id.append(name_id)
+        self.start_ns.append(start_ns)
+        self.duration_ns.append(duration_ns)
+        self.length.append(length)
+        self.rows_affected.append(rows_affected)
+        self.bytes_received.append(bytes_received)
+        self.ok.append(error is None)
+
+    def __len__(self):
+        return len(self.ok)
+
+    def clear(self):
+        del self.name_id[:]
+        del self.start_ns[:]
+        del self.duration_ns[:]
+        del self.length[:]
+        del self.rows_affected[:]
+        del self.bytes_received[:]
+        del self.ok[:]
+        self.errors = {}
+
+    def flush(self, *args, **kwargs):
+        """Fold all buffered timings into RequestStats"""
+        if not self.ok:
+            return
+        stats = self.stats
+        total = stats.total
+        entries = [stats.get(name, method) for (name, method) in self.names]
+        errors = self.errors
+        wall_offset = self.wall_offset
+        for i, (name_id, start_ns, duration_ns, length, rows_affected, received, ok) in enumerate(
+            zip(
+                self.name_id,
+                self.start_ns,
+                self.duration_ns,
+                self.length,
+                self.rows_affected,
+                self.bytes_received,
+                self.ok,
+            )
+        ):
+            timestamp = wall_offset + (start_ns + duration_ns) / 1e9
+            response_time = duration_ns / 1_000_000
+            entry = entries[name_id]
+            log_at(entry, timestamp, response_time, length)
+            log_at(total, timestamp, response_time, length)
+            if rows_affected or received:
+                name, method = self.names[name_id]
+                log_io(stats, name, method, rows_affected, received)
+            if not ok:
+                name, method = self.names[name_id]
+                stats.log_error(method, name, errors[i])
+        self.clear()
+
+    def reset(self, *args, **kwargs):
+        """Stats have been reset: drop everything measured before that"""
+        self.clear()
+
+    def start(self, environment):
+        """Flush periodically and before every report to master"""
+        # report_to_master listeners run in order and locust serializes stats in the first one
+        environment.events.report_to_master._handlers.insert(0, self.flush)
+        environment.events.reset_stats.add_listener(self.reset)
+        environment.events.test_stop.add_listener(self.flush)
+        self.flusher = gevent.spawn(self._flush_loop)
+
+    def _flush_loop(self):
+        while True:
+            gevent.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Stats buffer flush failed: {e}")
+                self.clear()
+
+
+def log_at(entry, timestamp, response_time, content_length):
+    """StatsEntry.log() for request finished at given timestamp"""
+    t = int(timestamp)
+    if (
+        entry.use_response_times_cache
+        and entry.last_request_timestamp
+        and t > int(entry.last_request_timestamp)
+    ):
+        entry._cache_response_times(t - 1)
+
+    entry.num_requests += 1
+    entry.num_reqs_per_sec[t] = entry.num_reqs_per_sec.get(t, 0) + 1
+    if entry.last_request_timestamp is None or timestamp > entry.last_request_timestamp:
+        entry.last_request_timestamp = timestamp
+    entry._log_response_time(response_time)
+    entry.total_content_length += content_length